@@ -0,0 +1,302 @@
+"""Бэкенд кэша, хранящий данные в файле базы данных SQLite.
+
+В отличие от LocMemCache, кэш общий для всех процессов, работающих
+на одном сервере, и не требует отдельного сервера, как Memcached или
+Redis. Параллельный доступ обеспечивается блокировками SQLite и режимом
+журнала WAL. Размер кэша ограничивается параметрами MAX_ENTRIES
+(число записей) и MAX_SIZE (суммарный размер значений в байтах).
+Число записей и их суммарный размер поддерживаются триггерами в таблице
+cache_stats, поэтому проверка ограничений при записи не просматривает
+таблицу. При превышении ограничений удаляются записи с истёкшим сроком
+хранения, а затем — если этого недостаточно — записи, сохранённые раньше
+остальных (FIFO: обращения к записям порядок удаления не меняют).
+
+Значения, сериализованные в pickle, размер которых не меньше
+OPTIONS['COMPRESS_MIN_SIZE'] байт, сжимаются zlib с уровнем
+OPTIONS['COMPRESS_LEVEL']. Сжатые значения отличаются от несжатых первым
+байтом: поток zlib начинается с 0x78, а pickle протокола 2 и выше — с 0x80.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SQLITE_BUSY_TIMEOUT = 30
+
+SQLITE_MAX_VARIABLES = 999
+
+SCHEMA = '''
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    stored REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_stored_idx ON cache (stored);
+CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    count INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, count, size)
+    SELECT 1, COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache;
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats
+    SET count = count + 1, size = size + LENGTH(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF value ON cache
+BEGIN
+    UPDATE cache_stats
+    SET size = size - LENGTH(OLD.value) + LENGTH(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats
+    SET count = count - 1, size = size - LENGTH(OLD.value);
+END;
+COMMIT;
+'''
+
+NOT_EXPIRED = '(expires IS NULL OR expires > ?)'
+
+ZLIB_HEADER = b'\x78'
+
+
+def dump_value(value, compress_min_size=None,
+               compress_level=zlib.Z_DEFAULT_COMPRESSION):
+    """Сериализует значение value и сжимает его, если размер
+    сериализованного значения не меньше compress_min_size байт.
+    """
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if compress_min_size is not None and len(data) >= compress_min_size:
+        data = zlib.compress(data, compress_level)
+    return data
+
+
+def load_value(data):
+    """Восстанавливает значение, сериализованное функцией dump_value."""
+    if data[:1] == ZLIB_HEADER:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+class SQLiteCache(BaseCache):
+    """Бэкенд кэша, хранящий данные в файле базы данных SQLite.
+
+    LOCATION — путь к файлу базы данных. Параметр OPTIONS['MAX_SIZE']
+    ограничивает суммарный размер значений в байтах, а параметры
+    OPTIONS['COMPRESS_MIN_SIZE'] и OPTIONS['COMPRESS_LEVEL'] управляют
+    сжатием значений.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_size = options.get('MAX_SIZE')
+        self._compress_min_size = options.get('COMPRESS_MIN_SIZE')
+        self._compress_level = options.get('COMPRESS_LEVEL',
+                                           zlib.Z_DEFAULT_COMPRESSION)
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        """Возвращает соединение с базой данных для текущего потока.
+
+        Соединения не передаются дочерним процессам, созданным fork().
+        """
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(
+                self._path, timeout=SQLITE_BUSY_TIMEOUT,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    @contextmanager
+    def _write(self):
+        """Выполняет изменения базы данных в одной транзакции, сразу
+        захватывая блокировку записи.
+        """
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _prepare_key(self, key, version):
+        """Возвращает ключ key в том виде, в каком он хранится в базе."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dump(self, value):
+        """Сериализует значение value для сохранения в базе."""
+        return dump_value(value, self._compress_min_size,
+                          self._compress_level)
+
+    def _store(self, connection, key, value, timeout, replace):
+        """Сохраняет значение value под ключом key и возвращает True,
+        если оно сохранено. При replace=False действующая запись
+        не заменяется.
+        """
+        now = time.time()
+        condition = '' if replace else f'WHERE NOT {NOT_EXPIRED}'
+        params = (key, self._dump(value),
+                  self.get_backend_timeout(timeout), now)
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires, stored) '
+            'VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires, stored = excluded.stored '
+            f'{condition}',
+            params if replace else params + (now,)
+        )
+        return cursor.rowcount > 0
+
+    def _is_full(self, connection):
+        """Кэш превышает допустимое число записей или размер?"""
+        count, size = connection.execute(
+            'SELECT count, size FROM cache_stats'
+        ).fetchone()
+        return (count > self._max_entries
+                or self._max_size is not None and size > self._max_size)
+
+    def _cull(self, connection):
+        """Если кэш превышает допустимый размер, удаляет записи с истёкшим
+        сроком хранения, а затем, если этого недостаточно, записи,
+        сохранённые раньше остальных.
+        """
+        if not self._is_full(connection):
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        if not self._is_full(connection):
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        count, = connection.execute(
+            'SELECT count FROM cache_stats'
+        ).fetchone()
+        excess = max(count - self._max_entries,
+                     count // self._cull_frequency, 1)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY stored LIMIT ?)',
+            (excess,)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare_key(key, version)
+        with self._write() as connection:
+            added = self._store(connection, key, value, timeout, False)
+            if added:
+                self._cull(connection)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._prepare_key(key, version)
+        row = self._connection.execute(
+            f'SELECT value FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else load_value(row[0])
+
+    def get_many(self, keys, version=None):
+        prepared = {self._prepare_key(key, version): key for key in keys}
+        prepared_keys = list(prepared)
+        now = time.time()
+        values = {}
+        chunk_size = SQLITE_MAX_VARIABLES - 1
+        for start in range(0, len(prepared_keys), chunk_size):
+            chunk = prepared_keys[start:start + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._connection.execute(
+                f'SELECT key, value FROM cache '
+                f'WHERE key IN ({placeholders}) AND {NOT_EXPIRED}',
+                (*chunk, now)
+            )
+            values.update(
+                (prepared[key], load_value(value)) for key, value in rows
+            )
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare_key(key, version)
+        with self._write() as connection:
+            self._store(connection, key, value, timeout, True)
+            self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._write() as connection:
+            for key, value in data.items():
+                key = self._prepare_key(key, version)
+                self._store(connection, key, value, timeout, True)
+            self._cull(connection)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._prepare_key(key, version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache SET expires = ? '
+                f'WHERE key = ? AND {NOT_EXPIRED}',
+                (self.get_backend_timeout(timeout), key, time.time())
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._prepare_key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = load_value(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (self._dump(value), key)
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self._prepare_key(key, version)
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        with self._write() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                ((self._prepare_key(key, version),) for key in keys)
+            )
+
+    def has_key(self, key, version=None):
+        key = self._prepare_key(key, version)
+        row = self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
@@ -0,0 +1,185 @@
+"""Тесты для проверки бэкенда кэша SQLiteCache."""
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+INCREMENTS_PER_PROCESS = 50
+
+
+def make_cache(path, **options):
+    """Возвращает кэш, хранящий данные в файле path."""
+    return SQLiteCache(path, {'OPTIONS': options})
+
+
+def increment(path, key):
+    """Увеличивает значение key в кэше из отдельного процесса."""
+    cache = make_cache(path)
+    for _ in range(INCREMENTS_PER_PROCESS):
+        cache.incr(key)
+
+
+class SQLiteCacheTestCase(SimpleTestCase):
+    """Набор тестов для проверки бэкенда кэша SQLiteCache."""
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def test_values_are_stored(self):
+        """Значения сохраняются, читаются и удаляются?"""
+        self.cache.set('key', {'value': 1})
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_values_expire(self):
+        """Значения недоступны по истечении срока хранения?"""
+        self.cache.set('key', 'value', 10)
+        self.cache.set('forever', 'value', None)
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertFalse(self.cache.has_key('key'))
+            self.assertEqual(self.cache.get('forever'), 'value')
+            self.assertTrue(self.cache.add('key', 'new value'))
+        self.assertEqual(self.cache.get('key'), 'new value')
+
+    def test_add_keeps_existing_value(self):
+        """add() не заменяет действующее значение?"""
+        self.assertTrue(self.cache.add('key', 'value'))
+        self.assertFalse(self.cache.add('key', 'other value'))
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_incr(self):
+        """incr() увеличивает значение и сообщает об отсутствии ключа?"""
+        self.cache.set('key', 1)
+        self.assertEqual(self.cache.incr('key', 2), 3)
+        self.assertEqual(self.cache.get('key'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cache_is_bounded_by_entries(self):
+        """Количество записей не превышает MAX_ENTRIES, а удаляются самые
+        старые записи?
+        """
+        cache = make_cache(self.path, MAX_ENTRIES=10)
+        for n in range(25):
+            cache.set(f'key-{n}', n)
+        self.assertLessEqual(len(cache.get_many(
+            [f'key-{n}' for n in range(25)]
+        )), 10)
+        self.assertEqual(cache.get('key-24'), 24)
+        self.assertIsNone(cache.get('key-0'))
+
+    def test_cache_is_bounded_by_size(self):
+        """Суммарный размер значений не превышает MAX_SIZE?"""
+        cache = make_cache(self.path, MAX_SIZE=10 * 1024)
+        for n in range(20):
+            cache.set(f'key-{n}', b'x' * 1024)
+        size = sum(len(value) for value in cache.get_many(
+            [f'key-{n}' for n in range(20)]
+        ).values())
+        self.assertLessEqual(size, 10 * 1024)
+        self.assertIsNotNone(cache.get('key-19'))
+
+    def _get_usage(self):
+        """Возвращает хранимые и вычисленные по таблице число записей
+        и их суммарный размер.
+        """
+        with sqlite3.connect(self.path) as connection:
+            return (
+                connection.execute(
+                    'SELECT count, size FROM cache_stats'
+                ).fetchone(),
+                connection.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) '
+                    'FROM cache'
+                ).fetchone(),
+            )
+
+    def test_usage_is_tracked(self):
+        """Число записей и их суммарный размер поддерживаются при всех
+        изменениях кэша?
+        """
+        self.cache.set('key', 'value')
+        self.cache.set('key', 'longer value')
+        self.cache.add('key', 'other value')
+        self.cache.add('other', b'x' * 100)
+        self.cache.set_many({'a': 1, 'b': 10 ** 100})
+        self.cache.incr('b')
+        self.cache.delete('a')
+        self.cache.delete_many(['other', 'missing'])
+        stored, actual = self._get_usage()
+        self.assertEqual(stored, actual)
+        self.assertEqual(stored[0], 2)
+
+    def test_usage_of_existing_cache_is_counted(self):
+        """Записи, сохранённые до появления учёта размера, учитываются?"""
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(
+                'CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB '
+                'NOT NULL, expires REAL, stored REAL NOT NULL);'
+                "INSERT INTO cache VALUES ('a', x'00ff', NULL, 0);"
+            )
+        make_cache(self.path).set('b', 1)
+        stored, actual = self._get_usage()
+        self.assertEqual(stored, actual)
+        self.assertEqual(stored[0], 2)
+
+    def test_many_keys_are_read(self):
+        """get_many() читает больше ключей, чем параметров в запросе
+        SQLite?
+        """
+        cache = make_cache(self.path, MAX_ENTRIES=5000)
+        data = {f'key-{n}': n for n in range(2000)}
+        cache.set_many(data)
+        self.assertEqual(cache.get_many(data), data)
+
+    def test_large_values_are_compressed(self):
+        """Значения не меньше COMPRESS_MIN_SIZE байт хранятся сжатыми?"""
+        cache = make_cache(self.path, COMPRESS_MIN_SIZE=1024)
+        large = '<article>Запись.</article>' * 100
+        cache.set('large', large)
+        cache.set('small', 'Запись.')
+        cache.set('counter', 10 ** 1000)
+        cache.incr('counter')
+        self.assertEqual(cache.get('large'), large)
+        self.assertEqual(cache.get('small'), 'Запись.')
+        self.assertEqual(cache.get('counter'), 10 ** 1000 + 1)
+        with sqlite3.connect(self.path) as connection:
+            sizes = dict(connection.execute(
+                'SELECT key, LENGTH(value) FROM cache'
+            ))
+        self.assertLess(sizes[cache.make_key('large')], len(large) // 10)
+
+    def test_cache_is_shared_between_processes(self):
+        """Кэш общий для процессов, а incr() из разных процессов
+        не теряет изменений?
+        """
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.path, 'counter'))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.cache.get('counter'),
+                         4 * INCREMENTS_PER_PROCESS)
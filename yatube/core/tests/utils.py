@@ -1,7 +1,9 @@
 """Базовые классы для наборов тестов в других приложениях."""
+from contextlib import contextmanager
 from functools import partial
 from http import HTTPStatus
 
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.test import TestCase
 from django.core.cache import cache
 from django.urls import reverse
@@ -11,10 +13,29 @@ class BaseTestCase(TestCase):
     """Базовый класс для всех наборов теcтов в проекте Yatube."""
 
     def setUp(self):
-        """Создаёт фикстуры для отдельного теста."""
+        """Создаёт фикстуры для отдельного теста.
+
+        Фикстуры всего набора считаются зафиксированными: функции,
+        зарегистрированные при их создании transaction.on_commit,
+        отбрасываются.
+        """
         super().setUp()
+        connections[DEFAULT_DB_ALIAS].run_on_commit.clear()
         cache.clear()
 
+    @contextmanager
+    def run_on_commit_callbacks(self, using=DEFAULT_DB_ALIAS):
+        """Выполняет функции, зарегистрированные transaction.on_commit
+        внутри блока with, при выходе из него, как если бы транзакция
+        теста была зафиксирована, и удаляет их из очереди.
+        """
+        connection = connections[using]
+        start = len(connection.run_on_commit)
+        yield
+        while start < len(connection.run_on_commit):
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
+
 
 class URLTests(BaseTestCase):
     """Набор функций для проверки реакций при обращении к URL."""
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import filter_matching
 
 
 @admin.register(Post)
@@ -13,6 +14,23 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет записи по полнотекстовому индексу вместо просмотра
+        таблицы с LIKE.
+        """
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        """Сохраняет изменённую запись только по полям формы, не затирая
+        количество комментариев, учтённых после её загрузки.
+        """
+        if change:
+            obj.save(update_fields=list(form.base_fields))
+        else:
+            obj.save()
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
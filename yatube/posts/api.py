@@ -0,0 +1,235 @@
+"""Программный интерфейс для чтения лент записей в формате JSON.
+
+Ленты выдаются страницами по курсору (см. posts.utils.make_cursor):
+курсор следующей страницы возвращается в поле next ответа и передаётся
+в параметре after запроса. Параметр fields ограничивает набор полей
+записей, а limit — размер страницы.
+
+Записи читаются из базы данных в виде строк values() без создания
+объектов моделей и сериализуются по мере чтения: ответ отдаётся
+частями через StreamingHttpResponse, поэтому большая страница никогда
+не формируется в памяти целиком.
+"""
+import heapq
+import json
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+
+from users.models import User
+from .models import Post, Group
+from .timelines import FollowFeed
+from .utils import decode_cursor, make_cursor
+from .constants import (API_PAGE_SIZE, API_MAX_PAGE_SIZE,
+                        API_STREAM_CHUNK_SIZE)
+
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+
+KEY_LOOKUPS = ('id', 'pub_date')
+
+
+class BadRequest(Exception):
+    """Исключение, возникающее при некорректных параметрах запроса."""
+
+
+def parse_fields(request):
+    """Возвращает список полей записей, запрошенных параметром fields."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(FIELDS)
+    fields = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Допустимые поля: {", ".join(FIELDS)}.'
+        )
+    return fields
+
+
+def parse_limit(request):
+    """Возвращает размер страницы, запрошенный параметром limit."""
+    value = request.GET.get('limit')
+    if value is None:
+        return API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise BadRequest(
+            f'Параметр limit должен быть целым числом '
+            f'от 1 до {API_MAX_PAGE_SIZE}.'
+        )
+    return limit
+
+
+def get_lookups(fields):
+    """Возвращает поля values(), необходимые для полей записей fields
+    и курсора.
+    """
+    return list(dict.fromkeys(
+        (*KEY_LOOKUPS, *(FIELDS[name] for name in fields))
+    ))
+
+
+def read_page(lookups, after, limit, date_lookup='pub_date', conditions=Q(),
+              **filters):
+    """Возвращает итератор по строкам записей, отобранных условием
+    conditions и условиями filters и следующих за курсором after,
+    в порядке убывания ключа (date_lookup, id). Итератор выдаёт
+    не больше limit + 1 строк.
+
+    Условия и ключ применяются одним вызовом filter(), чтобы условия
+    на связанные объекты относились к одному и тому же объекту.
+    """
+    conditions &= Q(**filters)
+    key = decode_cursor(after)
+    if key is not None:
+        pub_date, pk = key
+        conditions &= (
+            Q(**{f'{date_lookup}__lt': pub_date})
+            | Q(**{date_lookup: pub_date, 'pk__lt': pk})
+        )
+    posts = Post.objects.filter(conditions).order_by(
+        f'-{date_lookup}', '-pk'
+    )
+    return posts.values(*lookups)[:limit + 1].iterator()
+
+
+def serialize_row(row, fields):
+    """Возвращает словарь полей fields записи, прочитанной строкой row."""
+    data = {name: row[FIELDS[name]] for name in fields}
+    if data.get('image'):
+        data['image'] = default_storage.url(data['image'])
+    elif 'image' in data:
+        data['image'] = None
+    return data
+
+
+def stream_page(rows, fields, limit):
+    """Сериализует страницу из первых limit строк rows в JSON по частям.
+
+    Если строк больше limit, в поле next помещается курсор следующей
+    страницы.
+    """
+    yield '{"results": ['
+    separator = ''
+    chunk = []
+    last_row = None
+    next_cursor = None
+    for number, row in enumerate(rows):
+        if number == limit:
+            next_cursor = make_cursor(last_row['pub_date'], last_row['id'])
+            break
+        chunk.append(json.dumps(serialize_row(row, fields),
+                                cls=DjangoJSONEncoder, ensure_ascii=False))
+        last_row = row
+        if len(chunk) == API_STREAM_CHUNK_SIZE:
+            yield separator + ', '.join(chunk)
+            separator = ', '
+            chunk = []
+    if chunk:
+        yield separator + ', '.join(chunk)
+    yield f'], "next": {json.dumps(next_cursor)}}}'
+
+
+def feed_response(request, get_rows):
+    """Возвращает потоковый ответ со страницей ленты, строки которой
+    возвращает get_rows(lookups, after, limit), или ответ с ошибкой.
+    """
+    try:
+        fields = parse_fields(request)
+        limit = parse_limit(request)
+    except BadRequest as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    rows = get_rows(get_lookups(fields), request.GET.get('after'), limit)
+    return StreamingHttpResponse(stream_page(rows, fields, limit),
+                                 content_type='application/json')
+
+
+def not_found(message):
+    """Возвращает ответ с сообщением message об отсутствии объекта."""
+    return JsonResponse({'error': message}, status=404)
+
+
+def index(request):
+    """Отдаёт ленту всех записей."""
+    return feed_response(
+        request,
+        lambda lookups, after, limit: read_page(lookups, after, limit)
+    )
+
+
+def group_posts(request, slug):
+    """Отдаёт ленту записей группы slug."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return not_found('Группа не найдена.')
+    return feed_response(
+        request,
+        lambda lookups, after, limit: read_page(
+            lookups, after, limit, group_id=group_id
+        )
+    )
+
+
+def profile(request, username):
+    """Отдаёт ленту записей пользователя username."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return not_found('Пользователь не найден.')
+    return feed_response(
+        request,
+        lambda lookups, after, limit: read_page(
+            lookups, after, limit, author_id=author_id
+        )
+    )
+
+
+def follow_index(request):
+    """Отдаёт ленту подписок текущего пользователя.
+
+    Записи, разложенные по ленте пользователя, и записи «тяжёлых» авторов
+    (см. posts.timelines) читаются двумя запросами и сливаются по ключу
+    (pub_date, id). Записи «тяжёлых» авторов, оставшиеся в ленте,
+    исключаются из первого запроса.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется авторизация.'}, status=401)
+    feed = FollowFeed(request.user)
+
+    def get_rows(lookups, after, limit):
+        pushed = read_page(
+            lookups, after, limit, 'timeline_entries__pub_date',
+            ~Q(author_id__in=feed.pulled_author_ids),
+            timeline_entries__user=request.user
+        )
+        if not feed.pulled_author_ids:
+            return pushed
+        pulled = read_page(
+            lookups, after, limit, author_id__in=feed.pulled_author_ids
+        )
+        return islice(heapq.merge(
+            pushed, pulled, key=lambda row: (row['pub_date'], row['id']),
+            reverse=True
+        ), limit + 1)
+
+    return feed_response(request, get_rows)
@@ -6,3 +6,7 @@ class PostsConfig(AppConfig):
 
     name = 'posts'
     verbose_name = 'Публикации пользователей'
+
+    def ready(self):
+        """Подключает обработчики сигналов приложения."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,426 @@
+"""Кэширование страниц приложения posts с версионированием содержимого.
+
+Каждой области ленты (см. posts.counters) и каждой странице группы или
+пользователя соответствует номер версии, хранящийся в кэше и увеличиваемый
+обработчиками сигналов (см. posts.signals) после фиксации транзакции,
+изменившей её содержимое.
+Номера версий входят в ключи кэша страниц, поэтому изменение содержимого
+делает устаревшие копии страниц недоступными, а неизменённые страницы можно
+хранить в кэше долго.
+
+Устаревшие по времени копии страниц отдаются сразу и обновляются после
+отправки ответа (stale-while-revalidate). Отсутствующую в кэше страницу
+формирует только один запрос, остальные ждут появления её копии.
+
+Перед общим кэшем (L2) действует небольшой LRU-кэш в памяти процесса (L1),
+из которого часто запрашиваемые страницы отдаются без обращения к L2
+и десериализации ответа. Копии в L1 проверяются по номерам версий, которые
+входят в ключ, и по сроку свежести.
+
+Номера версий должны быть общими для всех процессов сервера, поэтому
+долгие сроки хранения копий действуют только с общим кэшем (CACHE_DB).
+С кэшем в памяти процесса изменение, обработанное одним процессом,
+не делает недоступными копии страниц в других, и сроки хранения
+ограничиваются PROCESS_CACHE_SOFT_TIMEOUT и PROCESS_CACHE_HARD_TIMEOUT.
+
+Страницы снабжаются заголовком ETag, вычисляемым по тем же номерам версий
+без формирования страницы, что позволяет отвечать на условные запросы
+кодом 304. С кэшем в памяти процесса в ETag входит также номер интервала
+времени длиной PROCESS_CACHE_HARD_TIMEOUT, чтобы ответы 304 не продлевали
+жизнь страниц дольше, чем их копии в кэше.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from http import HTTPStatus
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .models import Post
+from .utils import make_server_timing
+from .constants import PROCESS_CACHE_SOFT_TIMEOUT, PROCESS_CACHE_HARD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = 'posts_version'
+
+RENDER_LOCK_TIMEOUT = 60
+RENDER_WAIT_TIMEOUT = 2
+RENDER_POLL_INTERVAL = 0.05
+
+LOCAL_CACHE_MAX_ENTRIES = 64
+
+
+def group_page_scope(slug):
+    """Возвращает область страницы группы slug."""
+    return ('group_page', slug)
+
+
+def profile_page_scope(username):
+    """Возвращает область страницы пользователя username."""
+    return ('profile_page', username)
+
+
+def make_version_key(scope):
+    """Возвращает ключ кэша для номера версии области scope."""
+    return ':'.join(str(part) for part in (VERSION_KEY_PREFIX, *scope))
+
+
+def get_versions(scopes):
+    """Возвращает список номеров версий областей scopes.
+
+    Отсутствующему в кэше номеру присваивается значение, зависящее от
+    текущего времени, чтобы не совпасть ни с одним из прежних номеров.
+    """
+    keys = [make_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {
+        key: time.time_ns() // 1000 for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    """Увеличивает номера версий областей scopes после фиксации текущей
+    транзакции, чтобы страница с новым номером версии не могла быть
+    сформирована по ещё не зафиксированным данным.
+    """
+    keys = [make_version_key(scope) for scope in scopes]
+
+    def apply():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+    apply.scopes = frozenset(scopes)
+    transaction.on_commit(apply)
+
+
+def has_pending_changes(scopes):
+    """Текущая транзакция изменила содержимое областей scopes, но ещё
+    не зафиксирована?
+
+    Такие изменения видны только внутри транзакции, поэтому страницы
+    этих областей нельзя ни брать из кэша, ни сохранять в него.
+    """
+    connection = transaction.get_connection()
+    return any(
+        not getattr(callback, 'scopes', frozenset()).isdisjoint(scopes)
+        for _, callback in connection.run_on_commit
+    )
+
+
+def is_cache_shared():
+    """Кэш по умолчанию общий для всех процессов сервера?"""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def get_page_timeouts(soft_timeout, hard_timeout):
+    """Возвращает пару сроков свежести и хранения копий страниц,
+    ограниченных для кэша в памяти процесса.
+    """
+    if is_cache_shared():
+        return soft_timeout, hard_timeout
+    return (min(soft_timeout, PROCESS_CACHE_SOFT_TIMEOUT),
+            min(hard_timeout, PROCESS_CACHE_HARD_TIMEOUT))
+
+
+def make_page_key(key_prefix, versions, request, vary_on_cookie=True):
+    """Возвращает ключ кэша для страницы, запрошенной запросом request.
+
+    Страницы содержат сведения о текущем пользователе, поэтому их копии
+    различаются по cookie, если не задано vary_on_cookie=False.
+    """
+    url_hash = hashlib.md5(
+        request.build_absolute_uri().encode()
+    ).hexdigest()
+    cookie = request.META.get('HTTP_COOKIE', '') if vary_on_cookie else ''
+    cookie_hash = hashlib.md5(cookie.encode()).hexdigest()
+    return '.'.join(
+        str(part) for part in (key_prefix, *versions, url_hash, cookie_hash)
+    )
+
+
+def make_etag(*parts):
+    """Возвращает ETag, вычисленный по частям parts.
+
+    Если кэш не общий для процессов, ETag меняется не реже, чем раз
+    в PROCESS_CACHE_HARD_TIMEOUT секунд.
+    """
+    if not is_cache_shared():
+        parts += (int(time.time() // PROCESS_CACHE_HARD_TIMEOUT),)
+    return quote_etag(hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest())
+
+
+def post_etag(request, post_id):
+    """Возвращает ETag страницы записи post_id, не формируя её, или None,
+    если записи нет.
+
+    ETag меняется при изменении записи, добавлении и удалении комментариев,
+    а также при изменении версии страницы автора, на которой учитываются
+    его записи и подписчики.
+    """
+    state = Post.objects.filter(pk=post_id).values_list(
+        'version', 'comments_count', 'last_comment_at', 'author__username'
+    ).first()
+    if state is None:
+        return None
+    *post_state, username = state
+    return make_etag(
+        request.get_full_path(), request.META.get('HTTP_COOKIE', ''),
+        *post_state, *get_versions([profile_page_scope(username)])
+    )
+
+
+def is_cacheable(response):
+    """Ответ response можно сохранить в кэше?"""
+    return (
+        not response.streaming
+        and response.status_code == HTTPStatus.OK
+        and not response.cookies
+    )
+
+
+class LocalPageCache:
+    """LRU-кэш свежих копий страниц в памяти процесса.
+
+    Хранит не сами ответы, а их содержимое и заголовки, и для каждого
+    обращения создаёт новый ответ, так как ответы изменяются middleware.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Возвращает свежую копию страницы под ключом key в виде пары
+        (срок свежести, ответ) или None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            fresh_until, status, headers, content = entry
+            if time.time() >= fresh_until:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        return fresh_until, response
+
+    def set(self, key, fresh_until, response):
+        """Сохраняет копию ответа response, если она свежая."""
+        if time.time() >= fresh_until:
+            return
+        entry = (fresh_until, response.status_code, list(response.items()),
+                 response.content)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Удаляет все копии страниц."""
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalPageCache(LOCAL_CACHE_MAX_ENTRIES)
+
+cache_stats = Counter()
+
+
+def get_cache_stats():
+    """Возвращает количество попаданий и промахов кэшей L1 и L2
+    в текущем процессе.
+    """
+    return {tier: {'hits': cache_stats[f'{tier}_hits'],
+                   'misses': cache_stats[f'{tier}_misses']}
+            for tier in ('l1', 'l2')}
+
+
+def make_cache_server_timing(duration):
+    """Формирует значение заголовка Server-Timing с длительностью
+    duration получения страницы и статистикой кэшей из get_cache_stats.
+    """
+    stats = {'duration': duration}
+    for tier, counts in get_cache_stats().items():
+        for name, count in counts.items():
+            stats[f'{tier}_{name}'] = count
+    return make_server_timing('page-cache', stats)
+
+
+def get_entry(key):
+    """Возвращает копию страницы под ключом key из кэша L1, а при её
+    отсутствии — из кэша L2, в виде пары (срок свежести, ответ) или None.
+    """
+    entry = local_cache.get(key)
+    if entry is not None:
+        cache_stats['l1_hits'] += 1
+        return entry
+    cache_stats['l1_misses'] += 1
+    entry = cache.get(key)
+    if entry is None:
+        cache_stats['l2_misses'] += 1
+        return None
+    cache_stats['l2_hits'] += 1
+    local_cache.set(key, *entry)
+    return entry
+
+
+def wait_for_entry(key, lock_key):
+    """Ожидает, пока запрос, удерживающий блокировку lock_key, сохранит
+    копию страницы под ключом key, и возвращает её.
+
+    Возвращает None, если блокировка снята без сохранения копии или
+    ожидание продлилось дольше RENDER_WAIT_TIMEOUT секунд.
+    """
+    deadline = time.monotonic() + RENDER_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(RENDER_POLL_INTERVAL)
+        entries = cache.get_many([key, lock_key])
+        if key in entries:
+            return entries[key]
+        if lock_key not in entries:
+            break
+    return None
+
+
+def render_once(render, key, lock_key):
+    """Формирует отсутствующую в кэше страницу вызовом render, если её
+    не формирует другой запрос, иначе дожидается её копии.
+    """
+    if cache.add(lock_key, True, RENDER_LOCK_TIMEOUT):
+        try:
+            return render()
+        finally:
+            cache.delete(lock_key)
+    entry = wait_for_entry(key, lock_key)
+    if entry is None:
+        return render()
+    _, response = entry
+    return response
+
+
+def serve_page(render, key):
+    """Возвращает копию страницы под ключом key из кэша, обновляя её
+    после отправки ответа, если она устарела, или формирует страницу
+    вызовом render.
+    """
+    entry = get_entry(key)
+    lock_key = f'{key}.lock'
+    if entry is None:
+        return render_once(render, key, lock_key)
+
+    fresh_until, response = entry
+    if (time.time() >= fresh_until
+            and cache.add(lock_key, True, RENDER_LOCK_TIMEOUT)):
+        response._closable_objects.append(DeferredRefresh(render, lock_key))
+    return response
+
+
+class DeferredRefresh:
+    """Обновляет копию страницы в кэше после отправки ответа клиенту.
+
+    Объект регистрируется в ответе как закрываемый: сервер закрывает ответ,
+    отдав его клиенту, и в этот момент страница формируется заново.
+    """
+
+    def __init__(self, refresh, lock_key):
+        self.refresh = refresh
+        self.lock_key = lock_key
+
+    def close(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Ошибка при обновлении страницы в кэше.')
+        finally:
+            cache.delete(self.lock_key)
+
+
+def versioned_cache_page(key_prefix, get_scopes, soft_timeout, hard_timeout,
+                         vary_on_cookie=True):
+    """Кэширует страницу под ключом, включающим номера версий областей,
+    возвращаемых get_scopes(request, *args, **kwargs).
+
+    Копия страницы считается свежей soft_timeout секунд и хранится
+    hard_timeout секунд (с кэшем в памяти процесса — не дольше сроков
+    из get_page_timeouts). Устаревшая, но ещё хранящаяся копия отдаётся
+    сразу, а страница формируется заново после отправки ответа —
+    только одним из запросов, получивших устаревшую копию. Отсутствующую
+    копию также формирует один запрос: остальные ждут её появления
+    до RENDER_WAIT_TIMEOUT секунд, а затем формируют страницу сами.
+
+    На условный запрос с совпадающим ETag отвечает кодом 304, не обращаясь
+    к копии страницы.
+
+    Ответ, полученный из кэша или сформированный заново, снабжается
+    заголовком Server-Timing с длительностью его получения
+    и статистикой попаданий в кэши L1 и L2 в текущем процессе.
+
+    Запрос, транзакция которого изменила содержимое страницы, но ещё
+    не зафиксирована, формирует страницу без кэша.
+
+    Страницы, не зависящие от текущего пользователя, можно кэшировать
+    с vary_on_cookie=False: тогда их копии общие для всех посетителей.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            scopes = get_scopes(request, *args, **kwargs)
+            if has_pending_changes(scopes):
+                return view(request, *args, **kwargs)
+
+            versions = get_versions(scopes)
+            key = make_page_key(key_prefix, versions, request,
+                                vary_on_cookie)
+
+            def render():
+                response = view(request, *args, **kwargs)
+                if vary_on_cookie:
+                    patch_vary_headers(response, ('Cookie',))
+                if is_cacheable(response):
+                    soft, hard = get_page_timeouts(soft_timeout,
+                                                   hard_timeout)
+                    fresh_until = time.time() + soft
+                    cache.set(key, (fresh_until, response), hard)
+                    local_cache.set(key, fresh_until, response)
+                return response
+
+            etag = make_etag(key)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                start = time.perf_counter()
+                response = serve_page(render, key)
+                response['Server-Timing'] = make_cache_server_timing(
+                    time.perf_counter() - start
+                )
+            response['ETag'] = etag
+            if vary_on_cookie:
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
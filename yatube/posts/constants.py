@@ -1,6 +1,35 @@
 NUMBER_OF_POSTS_ON_MAIN_PAGE = 10
 NUMBER_OF_POSTS_ON_GROUP_PAGE = 10
 NUMBER_OF_POSTS_ON_USER_PAGE = 10
+NUMBER_OF_COMMENTS_ON_POST_PAGE = 10
+NUMBER_OF_POSTS_ON_SEARCH_PAGE = 10
+NUMBER_OF_POSTS_IN_FEED = 20
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_CHUNK_SIZE = 100
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+BULK_CREATE_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 10000
 
 NUMBER_OF_POST_CHARS_DISPLAYED = 15
 NUMBER_OF_COMMENT_CHARS_DISPLAYED = 15
+NUMBER_OF_FEED_TITLE_CHARS = 60
+
+MAX_FOLLOWERS_FOR_FANOUT = 1000
+HEAVY_AUTHORS_CACHE_TIMEOUT = 60 * 10
+
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 5
+
+INDEX_PAGE_CACHE_SOFT_TIMEOUT = 60 * 10
+INDEX_PAGE_CACHE_HARD_TIMEOUT = 60 * 60
+GROUP_PAGE_CACHE_SOFT_TIMEOUT = 60 * 10
+GROUP_PAGE_CACHE_HARD_TIMEOUT = 60 * 60
+PROFILE_PAGE_CACHE_SOFT_TIMEOUT = 60 * 10
+PROFILE_PAGE_CACHE_HARD_TIMEOUT = 60 * 60
+FEED_CACHE_SOFT_TIMEOUT = 60 * 5
+FEED_CACHE_HARD_TIMEOUT = 60 * 60 * 24
+PROCESS_CACHE_SOFT_TIMEOUT = 10
+PROCESS_CACHE_HARD_TIMEOUT = 20
@@ -0,0 +1,73 @@
+"""Счётчики количества записей в лентах приложения posts.
+
+Счётчики хранятся в кэше и поддерживаются обработчиками сигналов
+(см. posts.signals). При отсутствии значения в кэше оно вычисляется
+запросом COUNT и сохраняется для последующих обращений.
+
+Изменения счётчиков применяются только после фиксации транзакции,
+поэтому откат транзакции их не искажает. Значения хранятся не дольше
+POSTS_COUNT_CACHE_TIMEOUT секунд, так что расхождение, возникшее
+из-за гонки с вычислением счётчика или из-за несвязанных кэшей
+нескольких процессов, со временем исправляется.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .constants import POSTS_COUNT_CACHE_TIMEOUT
+
+COUNTER_KEY_PREFIX = 'posts_count'
+
+ALL_POSTS_SCOPE = ('all',)
+
+
+def group_scope(group_id):
+    """Возвращает область ленты группы group_id."""
+    return ('group', group_id)
+
+
+def author_scope(author_id):
+    """Возвращает область ленты автора author_id."""
+    return ('author', author_id)
+
+
+def follower_scope(user_id):
+    """Возвращает область ленты подписок пользователя user_id."""
+    return ('follower', user_id)
+
+
+def make_counter_key(scope):
+    """Возвращает ключ кэша для счётчика области scope."""
+    return ':'.join(str(part) for part in (COUNTER_KEY_PREFIX, *scope))
+
+
+def get_posts_count(scope, posts):
+    """Возвращает количество записей posts в области scope."""
+    return cache.get_or_set(make_counter_key(scope), posts.count,
+                            POSTS_COUNT_CACHE_TIMEOUT)
+
+
+def change_posts_count(scopes, delta):
+    """Изменяет на delta значения счётчиков областей scopes после
+    фиксации текущей транзакции.
+
+    Отсутствующие в кэше счётчики не создаются: они будут вычислены
+    при следующем обращении.
+    """
+    keys = [make_counter_key(scope) for scope in scopes]
+
+    def apply():
+        for key in keys:
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                pass
+
+    transaction.on_commit(apply)
+
+
+def reset_posts_count(scopes):
+    """Сбрасывает счётчики областей scopes после фиксации текущей
+    транзакции.
+    """
+    keys = [make_counter_key(scope) for scope in scopes]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,150 @@
+"""Выгрузка персональных данных пользователя в ZIP-архив.
+
+Архив содержит сведения о пользователе (profile.json), его записи
+(posts.jsonl) и комментарии (comments.jsonl) в формате JSON Lines,
+а также изображения записей (images/). Архив формируется по мере
+отправки: записи и комментарии читаются запросами с .iterator(),
+изображения — порциями, а готовые части архива сразу отдаются
+клиенту, поэтому расход памяти не зависит от объёма данных.
+"""
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Post, Comment
+from .constants import EXPORT_CHUNK_SIZE
+
+IMAGES_DIR = 'images/'
+
+
+class StreamBuffer:
+    """Файлоподобный объект, накапливающий записанные в него данные
+    до их передачи клиенту.
+
+    Не поддерживает перемещение по файлу, поэтому zipfile записывает
+    размеры файлов архива после их содержимого.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self, min_size=0):
+        """Возвращает и удаляет накопленные данные, если их не меньше
+        min_size байт, иначе возвращает пустую строку.
+        """
+        if self.size < min_size or not self.size:
+            return b''
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def to_json(data):
+    """Возвращает словарь data в виде строки JSON."""
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def get_image_name(path):
+    """Возвращает имя файла архива для изображения path."""
+    return IMAGES_DIR + path
+
+
+def get_profile(user):
+    """Возвращает сведения о пользователе user."""
+    return {
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'date_joined': user.date_joined,
+    }
+
+
+def get_post_rows(user):
+    """Возвращает итератор по записям пользователя user в виде JSON."""
+    posts = Post.objects.filter(author=user).order_by('pk').values(
+        'id', 'pub_date', 'text', 'group__slug', 'image', 'comments_count'
+    )
+    for post in posts.iterator():
+        yield to_json({
+            'id': post['id'],
+            'pub_date': post['pub_date'],
+            'text': post['text'],
+            'group': post['group__slug'],
+            'image': get_image_name(post['image']) if post['image'] else None,
+            'comments_count': post['comments_count'],
+        })
+
+
+def get_comment_rows(user):
+    """Возвращает итератор по комментариям пользователя user в виде JSON."""
+    comments = Comment.objects.filter(author=user).order_by('pk').values(
+        'id', 'pub_date', 'text', 'post_id'
+    )
+    for comment in comments.iterator():
+        yield to_json({
+            'id': comment['id'],
+            'pub_date': comment['pub_date'],
+            'text': comment['text'],
+            'post': comment['post_id'],
+        })
+
+
+def write_user_archive(user):
+    """Записывает ZIP-архив с данными пользователя user, возвращая
+    накопленные части архива по мере записи. Части могут быть пустыми.
+    """
+    buffer = StreamBuffer()
+    date_time = timezone.localtime().timetuple()[:6]
+
+    def open_entry(name, compress_type=zipfile.ZIP_DEFLATED):
+        info = zipfile.ZipInfo(name, date_time)
+        info.compress_type = compress_type
+        return archive.open(info, 'w', force_zip64=True)
+
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        with open_entry('profile.json') as entry:
+            entry.write(to_json(get_profile(user)).encode())
+
+        for name, rows in (('posts.jsonl', get_post_rows(user)),
+                           ('comments.jsonl', get_comment_rows(user))):
+            with open_entry(name) as entry:
+                for row in rows:
+                    entry.write(f'{row}\n'.encode())
+                    yield buffer.pop(EXPORT_CHUNK_SIZE)
+            yield buffer.pop()
+
+        images = Post.objects.filter(author=user).exclude(
+            image=''
+        ).order_by('pk').values_list('image', flat=True)
+        for path in images.iterator():
+            if not default_storage.exists(path):
+                continue
+            with default_storage.open(path) as image:
+                with open_entry(get_image_name(path),
+                                zipfile.ZIP_STORED) as entry:
+                    for data in image.chunks(EXPORT_CHUNK_SIZE):
+                        entry.write(data)
+                        yield buffer.pop(EXPORT_CHUNK_SIZE)
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def stream_user_archive(user):
+    """Возвращает итератор по непустым частям ZIP-архива с данными
+    пользователя user.
+    """
+    return (chunk for chunk in write_user_archive(user) if chunk)
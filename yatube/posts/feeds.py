@@ -0,0 +1,144 @@
+"""Ленты записей в форматах RSS и Atom.
+
+Ленты кэшируются так же, как страницы с лентами (см. posts.caching):
+ключ копии включает номер версии области ленты, поэтому новая или
+изменённая запись сразу делает копию недоступной. Ленты не зависят
+от текущего пользователя, поэтому их копии общие для всех читателей,
+а ETag позволяет отвечать на периодические опросы кодом 304.
+"""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from users.models import User
+from . import counters
+from .caching import (versioned_cache_page, group_page_scope,
+                      profile_page_scope)
+from .models import Post, Group
+from .constants import (NUMBER_OF_POSTS_IN_FEED, NUMBER_OF_FEED_TITLE_CHARS,
+                        FEED_CACHE_SOFT_TIMEOUT, FEED_CACHE_HARD_TIMEOUT)
+
+
+class PostsFeed(Feed):
+    """Базовый класс лент записей в формате RSS."""
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(NUMBER_OF_FEED_TITLE_CHARS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_categories(self, item):
+        return [item.group.slug] if item.group else []
+
+
+class LatestPostsFeed(PostsFeed):
+    """Лента последних записей сайта в формате RSS."""
+
+    title = 'Yatube: последние записи'
+    description = 'Последние обновления на сайте.'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.for_cards()[:NUMBER_OF_POSTS_IN_FEED]
+
+
+class GroupPostsFeed(PostsFeed):
+    """Лента записей сообщества в формате RSS."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: записи сообщества {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def items(self, group):
+        return group.posts.for_cards()[:NUMBER_OF_POSTS_IN_FEED]
+
+
+class AuthorPostsFeed(PostsFeed):
+    """Лента записей пользователя в формате RSS."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return (f'Yatube: записи пользователя '
+                f'{author.get_full_name() or author.username}')
+
+    def description(self, author):
+        return f'Все записи пользователя {author.username}.'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def items(self, author):
+        return author.posts.for_cards()[:NUMBER_OF_POSTS_IN_FEED]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Лента последних записей сайта в формате Atom."""
+
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    """Лента записей сообщества в формате Atom."""
+
+    feed_type = Atom1Feed
+    subtitle = GroupPostsFeed.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    """Лента записей пользователя в формате Atom."""
+
+    feed_type = Atom1Feed
+    subtitle = AuthorPostsFeed.description
+
+
+def cached_feed(key_prefix, get_scopes):
+    """Кэширует ленту под ключом, включающим номера версий областей,
+    возвращаемых get_scopes(request, *args, **kwargs).
+    """
+    return versioned_cache_page(key_prefix, get_scopes,
+                                FEED_CACHE_SOFT_TIMEOUT,
+                                FEED_CACHE_HARD_TIMEOUT,
+                                vary_on_cookie=False)
+
+
+cache_latest_posts_feed = cached_feed(
+    'posts_feed', lambda request: [counters.ALL_POSTS_SCOPE]
+)
+cache_group_posts_feed = cached_feed(
+    'group_feed', lambda request, slug: [group_page_scope(slug)]
+)
+cache_author_posts_feed = cached_feed(
+    'profile_feed', lambda request, username: [profile_page_scope(username)]
+)
+
+latest_posts_rss = cache_latest_posts_feed(LatestPostsFeed())
+latest_posts_atom = cache_latest_posts_feed(LatestPostsAtomFeed())
+group_posts_rss = cache_group_posts_feed(GroupPostsFeed())
+group_posts_atom = cache_group_posts_feed(GroupPostsAtomFeed())
+author_posts_rss = cache_author_posts_feed(AuthorPostsFeed())
+author_posts_atom = cache_author_posts_feed(AuthorPostsAtomFeed())
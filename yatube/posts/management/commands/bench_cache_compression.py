@@ -0,0 +1,88 @@
+"""Команда для оценки сжатия кэшируемых страниц с лентами."""
+import inspect
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core.cache import dump_value, load_value
+from users.models import User
+from posts import views
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер кэшируемых страниц с лентами и время их '
+            'сериализации без сжатия и со сжатием zlib.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Количество групп и пользователей, страницы которых '
+                 'участвуют в оценке.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторений каждого измерения.'
+        )
+        parser.add_argument(
+            '--levels', type=int, nargs='+', default=[1, 6, 9],
+            help='Уровни сжатия zlib.'
+        )
+
+    def get_responses(self, pages):
+        """Формирует страницы с лентами в обход кэша страниц."""
+        factory = RequestFactory()
+        targets = [(views.index, {})]
+        targets.extend(
+            (views.group_posts, {'slug': slug})
+            for slug in Group.objects.values_list('slug', flat=True)[:pages]
+        )
+        targets.extend(
+            (views.profile, {'username': username})
+            for username in User.objects.filter(
+                posts__isnull=False
+            ).distinct().values_list('username', flat=True)[:pages]
+        )
+        for view, kwargs in targets:
+            request = factory.get('/')
+            request.user = AnonymousUser()
+            yield inspect.unwrap(view)(request, **kwargs)
+
+    def measure(self, values, repeat, **options):
+        """Возвращает суммарный размер сериализованных значений values
+        и среднее время их сериализации и восстановления в секундах.
+        """
+        start = time.perf_counter()
+        for _ in range(repeat):
+            dumped = [dump_value(value, **options) for value in values]
+        dump_time = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for data in dumped:
+                load_value(data)
+        load_time = (time.perf_counter() - start) / repeat
+        return sum(len(data) for data in dumped), dump_time, load_time
+
+    def handle(self, *args, **options):
+        responses = list(self.get_responses(options['pages']))
+        repeat = options['repeat']
+        self.stdout.write(f'Страниц: {len(responses)}')
+        self.stdout.write(
+            f'{"Сжатие":<10}{"Размер, КБ":>12}{"Доля":>8}'
+            f'{"Запись, мс":>12}{"Чтение, мс":>12}'
+        )
+        variants = [('нет', self.measure(responses, repeat))]
+        variants.extend(
+            (f'zlib-{level}', self.measure(
+                responses, repeat, compress_min_size=0, compress_level=level
+            ))
+            for level in options['levels']
+        )
+        raw_size = variants[0][1][0]
+        for name, (size, dump_time, load_time) in variants:
+            self.stdout.write(
+                f'{name:<10}{size / 1024:>12.1f}{size / raw_size:>8.1%}'
+                f'{dump_time * 1000:>12.2f}{load_time * 1000:>12.2f}'
+            )
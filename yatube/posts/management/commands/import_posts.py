@@ -0,0 +1,384 @@
+"""Команда для массового импорта записей и комментариев."""
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, F, Max, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.models import User
+from posts import caching, counters, search, stats, timelines
+from posts.models import Post, Group, Comment
+from posts.utils import get_bulk_batch_size, split_ids
+from posts.constants import BULK_CREATE_BATCH_SIZE, IMPORT_CHUNK_SIZE
+
+
+class InvalidRow(Exception):
+    """Исключение, возникающее при некорректной строке входного файла."""
+
+
+def create_objects(model, objects, batch_size):
+    """Создаёт объекты objects модели model пакетами с помощью bulk_create
+    и записывает заданные в объектах даты публикации, которые bulk_create
+    заменяет текущим временем, так как поле pub_date задано с auto_now_add.
+
+    Даты записываются запросами UPDATE с выражением CASE по пакетам,
+    поэтому объекты должны иметь id.
+    """
+    pub_dates = [obj.pub_date for obj in objects]
+    model.objects.bulk_create(
+        objects, batch_size=get_bulk_batch_size(model, batch_size)
+    )
+    for obj, pub_date in zip(objects, pub_dates):
+        obj.pub_date = pub_date
+    batch_size = min(batch_size, connection.ops.bulk_batch_size(
+        ['pk', 'pub_date', 'pk'], objects
+    ) or 1)
+    for start in range(0, len(objects), batch_size):
+        batch = objects[start:start + batch_size]
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(
+            pub_date=Case(
+                *(When(pk=obj.pk, then=Value(obj.pub_date))
+                  for obj in batch),
+                output_field=DateTimeField(),
+            )
+        )
+
+
+def get_last_id(model):
+    """Возвращает наибольший id, когда-либо выданный объекту модели
+    model, чтобы не назначать импортированным объектам id удалённых.
+    """
+    last_id = model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            last_id = max(last_id, row[0])
+    return last_id
+
+
+def assign_ids(objects, taken_ids=()):
+    """Назначает объектам objects без id следующие за последним выданным
+    id, не входящие в taken_ids. Вызывается под блокировкой lock_posts.
+    """
+    if not objects:
+        return
+    next_id = get_last_id(type(objects[0]))
+    for obj in objects:
+        if obj.pk is None:
+            next_id += 1
+            while next_id in taken_ids:
+                next_id += 1
+            obj.pk = next_id
+
+
+def lock_posts():
+    """Захватывает до конца текущей транзакции блокировку записи базы
+    данных SQLite, изменяя таблицу записей без изменения строк, чтобы
+    до фиксации транзакции никто другой не создал записей
+    и комментариев.
+    """
+    Post.objects.filter(pk=0).update(version=F('version'))
+
+
+def read_jsonl(file):
+    """Возвращает итератор по объектам файла JSON Lines."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: {error}')
+        if not isinstance(row, dict):
+            raise CommandError(f'Строка {number}: ожидается объект JSON.')
+        yield row
+
+
+def read_csv(file):
+    """Возвращает итератор по строкам файла CSV с заголовком."""
+    return csv.DictReader(file)
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = ('Импортирует записи или комментарии из файла JSON Lines или CSV. '
+            'Поля записей: author, text, group, pub_date, id; поля '
+            'комментариев: author, post, text, pub_date. Авторы указываются '
+            'именами пользователей, группы — идентификаторами (slug).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к импортируемому файлу.')
+        parser.add_argument(
+            '--model', choices=('post', 'comment'), default='post',
+            help='Импортируемые объекты.'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BULK_CREATE_BATCH_SIZE,
+            help='Количество объектов, создаваемых одним запросом; '
+                 'не превышает ограничений базы данных.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+            help='Количество строк, импортируемых в одной транзакции.'
+        )
+
+    def get_author_id(self, row):
+        """Возвращает id автора строки row."""
+        username = row.get('author')
+        if username not in self.author_ids:
+            raise InvalidRow(f'Неизвестный автор: {username}.')
+        return self.author_ids[username]
+
+    def get_pub_date(self, row):
+        """Возвращает дату публикации строки row или текущее время."""
+        value = row.get('pub_date')
+        if not value:
+            return timezone.now()
+        try:
+            pub_date = parse_datetime(value)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise InvalidRow(f'Некорректная дата публикации: {value}.')
+        if timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        return pub_date
+
+    def get_text(self, row):
+        """Возвращает текст строки row."""
+        text = row.get('text')
+        if not text:
+            raise InvalidRow('Нет текста.')
+        return text
+
+    def get_id(self, row, field):
+        """Возвращает целое число из поля field строки row или None."""
+        value = row.get(field)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise InvalidRow(f'Некорректное значение {field}: {value}.')
+
+    def make_post(self, row):
+        """Возвращает запись, описанную строкой row."""
+        slug = row.get('group') or None
+        if slug is not None and slug not in self.group_ids:
+            raise InvalidRow(f'Неизвестная группа: {slug}.')
+        return Post(
+            id=self.get_id(row, 'id'),
+            author_id=self.get_author_id(row),
+            group_id=self.group_ids.get(slug),
+            text=self.get_text(row),
+            pub_date=self.get_pub_date(row),
+        )
+
+    def make_comment(self, row):
+        """Возвращает комментарий, описанный строкой row."""
+        post_id = self.get_id(row, 'post')
+        if post_id is None:
+            raise InvalidRow('Не указана запись.')
+        return Comment(
+            post_id=post_id,
+            author_id=self.get_author_id(row),
+            text=self.get_text(row),
+            pub_date=self.get_pub_date(row),
+        )
+
+    def split_ids(self, ids):
+        """Возвращает итератор по частям ids, пригодным для условия
+        pk__in.
+        """
+        return split_ids(ids, self.batch_size)
+
+    def exclude_existing(self, posts):
+        """Возвращает записи из posts, id которых не заданы или ещё не
+        существуют в базе и не повторяются, и множество занятых id.
+        """
+        taken_ids = set()
+        for ids in self.split_ids(
+            {post.pk for post in posts if post.pk is not None}
+        ):
+            taken_ids.update(Post.objects.filter(
+                pk__in=ids
+            ).values_list('pk', flat=True))
+        new_posts = []
+        for post in posts:
+            if post.pk is not None:
+                if post.pk in taken_ids:
+                    continue
+                taken_ids.add(post.pk)
+            new_posts.append(post)
+        return new_posts, taken_ids
+
+    def bump_page_versions(self, author_ids, group_ids):
+        """Обновляет версии главной страницы и страниц авторов author_ids
+        и групп group_ids.
+        """
+        scopes = [counters.ALL_POSTS_SCOPE]
+        for ids in self.split_ids(author_ids):
+            scopes.extend(
+                caching.profile_page_scope(username)
+                for username in User.objects.filter(
+                    pk__in=ids
+                ).values_list('username', flat=True)
+            )
+        for ids in self.split_ids(group_ids):
+            scopes.extend(
+                caching.group_page_scope(slug)
+                for slug in Group.objects.filter(
+                    pk__in=ids
+                ).values_list('slug', flat=True)
+            )
+        caching.bump_versions(scopes)
+
+    def import_posts(self, posts):
+        """Создаёт записи posts и обновляет зависящие от них поисковый
+        индекс, ленты подписок, статистику, счётчики и версии страниц,
+        которые при создании записей по одной обновляются сигналами.
+
+        Записи с id, уже существующими в базе, пропускаются, поэтому
+        прерванный импорт записей с id можно повторить. Записям без id
+        id назначаются при импорте под блокировкой записи базы, поэтому
+        производные данные обновляются ровно для созданных записей.
+        Возвращает количество созданных и пропущенных записей.
+        """
+        with transaction.atomic():
+            lock_posts()
+            new_posts, taken_ids = self.exclude_existing(posts)
+            skipped = len(posts) - len(new_posts)
+            posts = new_posts
+            assign_ids(posts, taken_ids)
+            create_objects(Post, posts, self.batch_size)
+
+            search.index_posts((post.pk, post.text) for post in posts)
+            follower_ids = set()
+            for ids in self.split_ids(post.pk for post in posts):
+                follower_ids |= timelines.push_posts(
+                    Post.objects.filter(pk__in=ids), self.batch_size
+                )
+            author_ids = {post.author_id for post in posts}
+            group_ids = {post.group_id for post in posts} - {None}
+            for ids in self.split_ids(author_ids):
+                stats.refresh_stats(ids)
+
+        counters.reset_posts_count([
+            counters.ALL_POSTS_SCOPE,
+            *(counters.author_scope(author_id) for author_id in author_ids),
+            *(counters.group_scope(group_id) for group_id in group_ids),
+            *(counters.follower_scope(user_id) for user_id in follower_ids),
+        ])
+        self.bump_page_versions(author_ids, group_ids)
+        return len(posts), skipped
+
+    def import_comments(self, comments):
+        """Создаёт комментарии comments и обновляет количество
+        комментариев к записям и версии страниц, на которых оно
+        отображается.
+
+        Комментарии к несуществующим записям пропускаются. Возвращает
+        количество созданных и пропущенных комментариев.
+        """
+        with transaction.atomic():
+            lock_posts()
+            post_ids = set()
+            for ids in self.split_ids(
+                {comment.post_id for comment in comments}
+            ):
+                post_ids.update(Post.objects.filter(
+                    pk__in=ids
+                ).values_list('pk', flat=True))
+            valid = [comment for comment in comments
+                     if comment.post_id in post_ids]
+            assign_ids(valid)
+            create_objects(Comment, valid, self.batch_size)
+            for ids in self.split_ids(post_ids):
+                Post.objects.filter(pk__in=ids).refresh_comments_counts()
+
+        scopes = {counters.ALL_POSTS_SCOPE}
+        for ids in self.split_ids(post_ids):
+            pages = Post.objects.filter(pk__in=ids).order_by().values_list(
+                'author__username', 'group__slug'
+            ).distinct()
+            for username, slug in pages:
+                scopes.add(caching.profile_page_scope(username))
+                if slug is not None:
+                    scopes.add(caching.group_page_scope(slug))
+        caching.bump_versions(scopes)
+        return len(valid), len(comments) - len(valid)
+
+    def make_objects(self, rows, make_object, verbosity):
+        """Возвращает объекты, описанные строками rows, и количество
+        некорректных строк.
+        """
+        objects = []
+        for row in rows:
+            try:
+                objects.append(make_object(row))
+            except InvalidRow as error:
+                if verbosity > 1:
+                    self.stderr.write(f'Строка пропущена: {error}')
+        return objects, len(rows) - len(objects)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        self.batch_size = options['batch_size']
+        self.author_ids = dict(User.objects.values_list('username', 'pk'))
+        if options['model'] == 'post':
+            self.group_ids = dict(Group.objects.values_list('slug', 'pk'))
+            make_object, import_objects = self.make_post, self.import_posts
+        else:
+            make_object = self.make_comment
+            import_objects = self.import_comments
+
+        try:
+            file = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+
+        imported = skipped = 0
+        start = time.perf_counter()
+        with file:
+            rows = READERS[file_format](file)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                objects, invalid = self.make_objects(
+                    chunk, make_object, options['verbosity']
+                )
+                created, existing = import_objects(objects)
+                imported += created
+                skipped += invalid + existing
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'Импортировано строк: {imported}, пропущено: {skipped}, '
+                    f'{imported / elapsed:.0f} строк/с'
+                )
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - start:.1f} с. '
+            f'Импортировано строк: {imported}, пропущено: {skipped}.'
+        )
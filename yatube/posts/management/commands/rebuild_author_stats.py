@@ -0,0 +1,30 @@
+"""Команда для пересчёта статистики пользователей."""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.stats import find_stats_drift, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает статистику пользователей (количество записей, '
+            'подписчиков и подписок) и сообщает о расхождениях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти расхождения, не исправляя их; завершиться '
+                 'с ошибкой, если они есть.'
+        )
+
+    def handle(self, *args, **options):
+        drift = find_stats_drift() if options['check'] else rebuild_stats()
+        for user_id, (stored, computed) in sorted(drift.items()):
+            self.stdout.write(
+                f'Пользователь {user_id}: {stored} -> {computed}'
+            )
+        if options['check'] and drift:
+            raise CommandError(
+                f'Статистика расходится с данными у {len(drift)} '
+                f'пользователей.'
+            )
+        action = 'Найдено' if options['check'] else 'Исправлено'
+        self.stdout.write(f'{action} расхождений: {len(drift)}')
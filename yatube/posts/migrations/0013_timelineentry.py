@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.constants import MAX_FOLLOWERS_FOR_FANOUT
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    max_followers = getattr(settings, 'POSTS_MAX_FOLLOWERS_FOR_FANOUT',
+                            MAX_FOLLOWERS_FOR_FANOUT)
+    heavy_author_ids = Follow.objects.values('author_id').annotate(
+        followers=models.Count('pk')
+    ).filter(followers__gt=max_followers).values('author_id')
+    follows = Follow.objects.exclude(author_id__in=heavy_author_ids)
+    for follow in follows:
+        posts = Post.objects.filter(author_id=follow.author_id)
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                          pub_date=pub_date)
+            for post_id, pub_date in posts.values_list('id', 'pub_date')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_auto_20230215_2058'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Опубликовано')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Запись')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Записи лент подписок',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='post_in_timeline_only_once'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
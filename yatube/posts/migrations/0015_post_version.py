@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Увеличивается при каждом изменении записи', verbose_name='Версия'),
+        ),
+    ]
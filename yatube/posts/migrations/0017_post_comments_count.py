@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:03
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_counts(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    comments = Comment.objects.filter(post=models.OuterRef('pk')).order_by()
+    Post.objects.update(
+        comments_count=Coalesce(models.Subquery(
+            comments.values('post').annotate(
+                count=models.Count('pk')
+            ).values('count')
+        ), 0),
+        last_comment_at=models.Subquery(
+            comments.order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последний комментарий'),
+        ),
+        migrations.RunPython(fill_comments_counts, migrations.RunPython.noop),
+    ]
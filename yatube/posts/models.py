@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 
 from users.models import User
 from .constants import (NUMBER_OF_POST_CHARS_DISPLAYED,
@@ -30,6 +31,41 @@ class Published(models.Model):
         ordering = ['-pub_date']
 
 
+class PostQuerySet(models.QuerySet):
+    """Представляет набор записей."""
+
+    CARD_FIELDS = (
+        'id', 'pub_date', 'text', 'image', 'version', 'comments_count',
+        'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug',
+    )
+
+    def for_cards(self):
+        """Возвращает записи с загрузкой только тех полей, которые нужны
+        для отображения карточек записей в лентах.
+        """
+        return self.select_related('author', 'group').only(*self.CARD_FIELDS)
+
+    def refresh_comments_counts(self):
+        """Пересчитывает по данным базы количество комментариев к записям
+        и время последнего комментария и возвращает количество записей.
+        """
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')
+        ).order_by()
+        return self.update(
+            comments_count=Coalesce(models.Subquery(
+                comments.values('post').annotate(
+                    count=models.Count('pk')
+                ).values('count')
+            ), 0),
+            last_comment_at=models.Subquery(
+                comments.order_by('-pub_date').values('pub_date')[:1]
+            ),
+        )
+
+
 class Post(Published):
     """Представляет опубликованную запись."""
 
@@ -61,13 +97,69 @@ class Post(Published):
         blank=True,
     )
 
+    version = models.PositiveIntegerField(
+        'Версия',
+        help_text='Увеличивается при каждом изменении записи',
+        default=0,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+    last_comment_at = models.DateTimeField(
+        'Последний комментарий',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta(Published.Meta):
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:NUMBER_OF_POST_CHARS_DISPLAYED]
 
+    def save(self, *args, **kwargs):
+        """Сохраняет запись и увеличивает версию изменённой записи.
+
+        Версия увеличивается отдельным запросом UPDATE в базе данных,
+        чтобы одновременные изменения записи получали разные версии.
+        Загруженные ранее версия и количество комментариев могли
+        устареть, поэтому изменённую запись следует сохранять
+        с update_fields, не включающим эти поля.
+        """
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            Post.objects.filter(pk=self.pk).update(
+                version=models.F('version') + 1
+            )
+
+
+class CommentQuerySet(models.QuerySet):
+    """Представляет набор комментариев."""
+
+    def for_list(self):
+        """Возвращает комментарии с загрузкой только тех полей, которые
+        нужны для отображения списка комментариев к записи.
+        """
+        return self.select_related('author').only(
+            'pub_date', 'text', 'post', 'author__username'
+        )
+
 
 class Comment(Published):
     """Представляет комментарий к записи."""
@@ -89,9 +181,15 @@ class Comment(Published):
         on_delete=models.CASCADE,
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta(Published.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-pub_date', '-id'],
+                         name='comment_post_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:NUMBER_OF_COMMENT_CHARS_DISPLAYED]
@@ -125,3 +223,73 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user.username} --> {self.author.username}'
+
+
+class TimelineEntry(models.Model):
+    """Представляет запись в ленте подписок посетителя сайта.
+
+    Ленты заполняются при публикации записей и изменении подписок,
+    что позволяет получать ленту подписок без соединения с Follow.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Запись',
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField('Опубликовано')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='post_in_timeline_only_once'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} <-- {self.post}'
+
+
+class AuthorStats(models.Model):
+    """Представляет статистику пользователя: количество его записей,
+    подписчиков и подписок.
+
+    Статистика поддерживается обработчиками сигналов (см. posts.signals),
+    что избавляет страницы от запросов COUNT.
+    """
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        related_name='stats',
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return (f'{self.user.username}: {self.posts_count} / '
+                f'{self.followers_count} / {self.following_count}')
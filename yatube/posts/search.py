@@ -0,0 +1,157 @@
+"""Полнотекстовый поиск по записям.
+
+Тексты записей индексируются в виртуальной таблице FTS5 posts_post_fts,
+rowid строк которой совпадают с id записей. Индекс обновляется
+обработчиками сигналов (см. posts.signals), а не триггерами, так как
+SQLite-бэкенд Django при изменении таблицы posts_post пересоздаёт её
+и удаляет триггеры. Операции, не отправляющие сигналов (bulk_create,
+update), должны обновлять индекс вызовом index_posts или rebuild_index.
+
+Результаты поиска упорядочиваются по релевантности bm25 и id и
+выдаются страницами по ключу (релевантность, id).
+"""
+import math
+import re
+
+from django.db import connection
+
+from .utils import KeysetPage
+
+SEARCH_TABLE = 'posts_post_fts'
+
+RANK_SQL = f'bm25({SEARCH_TABLE})'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def index_posts(rows):
+    """Добавляет в индекс или обновляет тексты записей, заданных парами
+    (id, текст) rows.
+    """
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(post_id,) for post_id, _ in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (%s, %s)', rows
+        )
+
+
+def index_post(post):
+    """Добавляет текст записи post в индекс или обновляет его."""
+    index_posts([(post.pk, post.text)])
+
+
+def unindex_post(post_id):
+    """Удаляет запись post_id из индекса."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild_index():
+    """Заново заполняет индекс текстами всех записей."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text) '
+            f'SELECT id, text FROM posts_post'
+        )
+
+
+def make_match_query(text):
+    """Возвращает запрос FTS5, находящий записи, которые содержат слова,
+    начинающиеся с каждого из слов текста text, или None, если слов нет.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 в тексте не действуют.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_matching(queryset, text):
+    """Оставляет в наборе записей queryset только записи, найденные
+    по тексту text.
+    """
+    match = make_match_query(text)
+    if match is None:
+        return queryset.none()
+    return queryset.extra(
+        where=[f'posts_post.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+               f'WHERE {SEARCH_TABLE} MATCH %s)'],
+        params=[match],
+    )
+
+
+def encode_search_cursor(post):
+    """Возвращает курсор, указывающий на позицию записи post в результатах
+    поиска.
+    """
+    return f'{post.search_rank!r}_{post.pk}'
+
+
+def decode_search_cursor(cursor):
+    """Возвращает пару (релевантность, pk), закодированную в курсоре
+    cursor, или None, если курсор некорректен.
+    """
+    try:
+        rank, pk = cursor.rsplit('_', 1)
+        rank, pk = float(rank), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    if not math.isfinite(rank):
+        return None
+    return rank, pk
+
+
+class SearchPage(KeysetPage):
+    """Представляет страницу результатов поиска, сформированную
+    по курсору. Переход возможен только к менее релевантным записям.
+    """
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return encode_search_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        return None
+
+
+def search_posts(queryset, text, per_page, after=None):
+    """Возвращает страницу записей из набора queryset, найденных по тексту
+    text и следующих за курсором after, в порядке убывания релевантности.
+    Некорректный курсор игнорируется.
+    """
+    match = make_match_query(text)
+    if match is None:
+        return SearchPage([], None, has_next=False, has_previous=False)
+
+    results = queryset.extra(
+        select={'search_rank': RANK_SQL},
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE}.rowid = posts_post.id',
+               f'{SEARCH_TABLE} MATCH %s'],
+        params=[match],
+        order_by=['search_rank', 'id'],
+    )
+    key = decode_search_cursor(after)
+    if key is not None:
+        rank, pk = key
+        results = results.extra(
+            where=[f'({RANK_SQL} > %s OR '
+                   f'({RANK_SQL} = %s AND posts_post.id > %s))'],
+            params=[rank, rank, pk],
+        )
+    posts = list(results[:per_page + 1])
+    return SearchPage(
+        posts[:per_page], None,
+        has_next=len(posts) > per_page, has_previous=key is not None
+    )
@@ -0,0 +1,246 @@
+"""Обработчики сигналов моделей приложения posts."""
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from users.models import User
+from . import caching, counters, search, stats, timelines
+from .models import Post, Group, Comment, Follow, AuthorStats
+
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def get_post_scopes(post, group_id, follower_ids):
+    """Возвращает области лент, в которые входит запись post,
+    при условии, что она относится к группе group_id и разложена
+    по лентам подписчиков follower_ids.
+    """
+    scopes = [counters.ALL_POSTS_SCOPE, counters.author_scope(post.author_id)]
+    if group_id is not None:
+        scopes.append(counters.group_scope(group_id))
+    scopes.extend(counters.follower_scope(user_id) for user_id in follower_ids)
+    return scopes
+
+
+def get_post_page_scopes(post, group_ids):
+    """Возвращает области кэшированных страниц, на которых отображается
+    запись post, при условии, что она относится к группам group_ids.
+    """
+    scopes = [counters.ALL_POSTS_SCOPE,
+              caching.profile_page_scope(post.author.username)]
+    slugs = Group.objects.filter(
+        pk__in=[group_id for group_id in group_ids if group_id is not None]
+    ).values_list('slug', flat=True)
+    scopes.extend(caching.group_page_scope(slug) for slug in slugs)
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает группу, к которой запись относилась до сохранения."""
+    if instance._state.adding:
+        instance._saved_group_id = None
+        return
+    instance._saved_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def process_saved_post(sender, instance, created, update_fields,
+                       **kwargs):
+    """Раскладывает созданную запись по лентам подписчиков, учитывает
+    в счётчиках и статистике автора её создание или смену её группы,
+    обновляет её текст в поисковом индексе и версии кэшированных страниц.
+    """
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    if created or update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+    caching.bump_versions(get_post_page_scopes(
+        instance, {old_group_id, instance.group_id}
+    ))
+    if created:
+        follower_ids = timelines.push_post(instance)
+        counters.change_posts_count(
+            get_post_scopes(instance, instance.group_id, follower_ids), 1
+        )
+        stats.change_stats(instance.author_id, posts_count=1)
+        return
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counters.change_posts_count(
+                [counters.group_scope(old_group_id)], -1
+            )
+        if instance.group_id is not None:
+            counters.change_posts_count(
+                [counters.group_scope(instance.group_id)], 1
+            )
+
+
+@receiver(post_delete, sender=Post)
+def process_deleted_post(sender, instance, **kwargs):
+    """Учитывает в счётчиках и статистике автора удалённую запись,
+    удаляет её из поискового индекса и обновляет версии кэшированных
+    страниц.
+    """
+    search.unindex_post(instance.pk)
+    caching.bump_versions(
+        get_post_page_scopes(instance, {instance.group_id})
+    )
+    follower_ids = timelines.get_pushed_follower_ids(instance)
+    counters.change_posts_count(
+        get_post_scopes(instance, instance.group_id, follower_ids), -1
+    )
+    stats.change_stats(instance.author_id, posts_count=-1)
+
+
+def bump_commented_post_versions(post_id):
+    """Обновляет версии кэшированных страниц, на которых отображается
+    количество комментариев к записи post_id.
+    """
+    post = Post.objects.select_related('author').get(pk=post_id)
+    caching.bump_versions(get_post_page_scopes(post, {post.group_id}))
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Учитывает созданный комментарий в количестве комментариев к записи
+    и времени последнего комментария.
+    """
+    if not created:
+        return
+    Post.objects.filter(pk=instance.post_id).update(
+        comments_count=F('comments_count') + 1,
+        last_comment_at=instance.pub_date,
+    )
+    bump_commented_post_versions(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Учитывает удалённый комментарий в количестве комментариев к записи
+    и времени последнего комментария.
+    """
+    updated = Post.objects.filter(pk=instance.post_id).update(
+        comments_count=F('comments_count') - 1,
+        last_comment_at=Subquery(
+            Comment.objects.filter(
+                post=OuterRef('pk')
+            ).order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+    if updated:
+        bump_commented_post_versions(instance.post_id)
+
+
+def get_follow_page_scopes(follow):
+    """Возвращает области кэшированных страниц пользователей, на которых
+    отображается подписка follow.
+    """
+    return [caching.profile_page_scope(follow.user.username),
+            caching.profile_page_scope(follow.author.username)]
+
+
+@receiver(post_save, sender=Follow)
+def fill_follower_timeline(sender, instance, created, **kwargs):
+    """Добавляет записи автора в ленту нового подписчика, учитывает
+    подписку в статистике и обновляет версии страниц подписчика и автора.
+    """
+    if created:
+        timelines.update_author_weight(instance.author_id)
+        timelines.fill_timeline(instance.user_id, instance.author_id)
+        stats.change_stats(instance.author_id, followers_count=1)
+        stats.change_stats(instance.user_id, following_count=1)
+    counters.reset_posts_count([counters.follower_scope(instance.user_id)])
+    caching.bump_versions(get_follow_page_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def clear_follower_timeline(sender, instance, **kwargs):
+    """Удаляет записи автора из ленты бывшего подписчика, учитывает
+    удаление подписки в статистике и обновляет версии страниц подписчика
+    и автора.
+    """
+    timelines.update_author_weight(instance.author_id)
+    timelines.clear_timeline(instance.user_id, instance.author_id)
+    stats.change_stats(instance.author_id, followers_count=-1)
+    stats.change_stats(instance.user_id, following_count=-1)
+    counters.reset_posts_count([counters.follower_scope(instance.user_id)])
+    caching.bump_versions(get_follow_page_scopes(instance))
+
+
+def bump_post_versions(posts):
+    """Увеличивает версии записей posts, чтобы их карточки и страницы
+    сформировались заново, и обновляет версии кэшированных страниц,
+    на которых они отображаются.
+    """
+    posts.update(version=F('version') + 1)
+    pages = posts.order_by().values_list(
+        'author__username', 'group__slug'
+    ).distinct()
+    scopes = {counters.ALL_POSTS_SCOPE}
+    for username, slug in pages:
+        scopes.add(caching.profile_page_scope(username))
+        if slug is not None:
+            scopes.add(caching.group_page_scope(slug))
+    caching.bump_versions(scopes)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_names(sender, instance, **kwargs):
+    """Запоминает название и идентификатор группы до сохранения."""
+    instance._saved_names = None if instance._state.adding else (
+        Group.objects.filter(pk=instance.pk).values_list(
+            'title', 'slug'
+        ).first()
+    )
+
+
+@receiver(post_save, sender=Group)
+def bump_group_page_version(sender, instance, **kwargs):
+    """Обновляет версию страницы изменённой группы, а при смене её
+    названия или идентификатора — версии её записей и страниц с ними.
+    """
+    caching.bump_versions([caching.group_page_scope(instance.slug)])
+    saved_names = getattr(instance, '_saved_names', None)
+    if saved_names not in (None, (instance.title, instance.slug)):
+        bump_post_versions(Post.objects.filter(group=instance))
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields, **kwargs):
+    """Запоминает имена пользователя до сохранения, если они могут
+    измениться.
+    """
+    instance._saved_names = None
+    if instance._state.adding or (
+        update_fields is not None
+        and not set(update_fields) & set(USER_NAME_FIELDS)
+    ):
+        return
+    instance._saved_names = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def bump_user_page_versions(sender, instance, **kwargs):
+    """При смене имён пользователя обновляет версии его записей, записей
+    с его комментариями и страниц, на которых они отображаются.
+    """
+    saved_names = getattr(instance, '_saved_names', None)
+    names = tuple(getattr(instance, field) for field in USER_NAME_FIELDS)
+    if saved_names in (None, names):
+        return
+    bump_post_versions(Post.objects.filter(
+        Q(author=instance) | Q(comments__author=instance)
+    ))
+    caching.bump_versions([caching.profile_page_scope(saved_names[0]),
+                           caching.profile_page_scope(instance.username)])
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    """Создаёт статистику нового пользователя."""
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
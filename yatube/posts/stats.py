@@ -0,0 +1,104 @@
+"""Статистика пользователей: количество записей, подписчиков и подписок.
+
+Статистика хранится в модели AuthorStats и изменяется обработчиками
+сигналов (см. posts.signals) в одной транзакции с изменением записей
+и подписок. Функции rebuild_stats и find_stats_drift позволяют
+пересчитать статистику и найти её расхождения с данными, а refresh_stats —
+пересчитать статистику пользователей, записи которых созданы без
+отправки сигналов.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from users.models import User
+from .models import Post, Follow, AuthorStats
+
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def change_stats(user_id, **deltas):
+    """Изменяет поля статистики пользователя user_id на величины deltas,
+    не опуская их ниже нуля.
+
+    Отсутствующая статистика не создаётся: её нет у удаляемого
+    пользователя, статистика которого удаляется раньше его подписок
+    и записей, а у остальных её восстанавливает rebuild_stats.
+    """
+    AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def compute_stats(user_ids=None):
+    """Вычисляет по данным базы статистику пользователей user_ids
+    (по умолчанию всех) и возвращает словарь {id: поля статистики}.
+    """
+    users = User.objects.all()
+    posts = Post.objects.all()
+    followers = Follow.objects.all()
+    following = Follow.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        posts = posts.filter(author_id__in=user_ids)
+        followers = followers.filter(author_id__in=user_ids)
+        following = following.filter(user_id__in=user_ids)
+    counts = [
+        dict(queryset.order_by().values(field).annotate(
+            count=Count('pk')
+        ).values_list(field, 'count'))
+        for queryset, field in ((posts, 'author_id'),
+                                (followers, 'author_id'),
+                                (following, 'user_id'))
+    ]
+    return {
+        user_id: {
+            field: count.get(user_id, 0)
+            for field, count in zip(STATS_FIELDS, counts)
+        }
+        for user_id in users.values_list('pk', flat=True)
+    }
+
+
+def refresh_stats(user_ids):
+    """Пересчитывает по данным базы статистику пользователей user_ids."""
+    with transaction.atomic():
+        stats = compute_stats(user_ids)
+        AuthorStats.objects.filter(user_id__in=stats).delete()
+        AuthorStats.objects.bulk_create(
+            AuthorStats(user_id=user_id, **fields)
+            for user_id, fields in stats.items()
+        )
+
+
+def find_stats_drift():
+    """Возвращает словарь {id: (хранимая статистика, вычисленная
+    статистика)} для пользователей, статистика которых расходится
+    с данными базы или отсутствует.
+    """
+    stored = {
+        user_id: dict(zip(STATS_FIELDS, values))
+        for user_id, *values in AuthorStats.objects.values_list(
+            'user_id', *STATS_FIELDS
+        )
+    }
+    return {
+        user_id: (stored.get(user_id), stats)
+        for user_id, stats in compute_stats().items()
+        if stored.get(user_id) != stats
+    }
+
+
+def rebuild_stats():
+    """Исправляет расходящуюся с данными базы статистику пользователей
+    и возвращает словарь расхождений, как find_stats_drift.
+    """
+    with transaction.atomic():
+        drift = find_stats_drift()
+        AuthorStats.objects.filter(pk__in=drift).delete()
+        AuthorStats.objects.bulk_create(
+            AuthorStats(user_id=user_id, **stats)
+            for user_id, (_, stats) in drift.items()
+        )
+    return drift
@@ -0,0 +1,132 @@
+"""Тесты для проверки программного интерфейса лент записей."""
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post, Group, Follow
+
+
+class FeedApiTestCase(BaseTestCase):
+    """Набор тестов для проверки программного интерфейса лент записей."""
+
+    TOTAL_NUMBER_OF_POSTS = 7
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        for n in range(cls.TOTAL_NUMBER_OF_POSTS):
+            Post.objects.create(author=cls.author, text=f'Запись {n}.',
+                                group=cls.group if n % 2 else None)
+
+    def _get(self, url, params=None, client=None):
+        """Возвращает ответ на запрос к url и разобранное содержимое."""
+        response = (client or self.client).get(url, params)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return response, json.loads(content)
+
+    def _read_feed(self, url, params=None, client=None):
+        """Возвращает все записи ленты url, прочитанные по курсорам."""
+        params = dict(params or {})
+        response, data = self._get(url, params, client)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        results = data['results']
+        while data['next']:
+            _, data = self._get(url, {**params, 'after': data['next']},
+                                client)
+            results.extend(data['results'])
+        return results
+
+    def test_feeds_are_read_by_cursor(self):
+        """Ленты читаются по курсорам полностью, без пропусков и повторов,
+        от новых записей к старым?
+        """
+        feeds = (
+            (reverse('posts:api_index'), Post.objects.all()),
+            (reverse('posts:api_group', args=[self.group.slug]),
+             self.group.posts.all()),
+            (reverse('posts:api_profile', args=[self.author.username]),
+             self.author.posts.all()),
+        )
+        for url, posts in feeds:
+            with self.subTest(url=url):
+                results = self._read_feed(url, {'limit': 2})
+                self.assertEqual(
+                    [post['id'] for post in results],
+                    list(posts.order_by('-pub_date', '-pk').values_list(
+                        'pk', flat=True
+                    ))
+                )
+
+    def test_fields_are_selected(self):
+        """Записи содержат только запрошенные поля?"""
+        _, data = self._get(reverse('posts:api_index'),
+                            {'fields': 'text,author', 'limit': 1})
+        post = Post.objects.order_by('-pub_date', '-pk').first()
+        self.assertEqual(data['results'],
+                         [{'text': post.text, 'author': 'test-author'}])
+
+        _, data = self._get(reverse('posts:api_index'), {'limit': 1})
+        self.assertEqual(data['results'][0]['id'], post.pk)
+        self.assertIsNone(data['results'][0]['image'])
+        self.assertEqual(data['results'][0]['pub_date'],
+                         post.pub_date.isoformat()[:23] + 'Z')
+
+    def test_invalid_parameters_are_rejected(self):
+        """Некорректные параметры fields и limit отклоняются с кодом 400?"""
+        url = reverse('posts:api_index')
+        for params in ({'fields': 'text,password'}, {'fields': ','},
+                       {'limit': 0}, {'limit': 'x'}, {'limit': 10 ** 6}):
+            with self.subTest(params=params):
+                response, data = self._get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', data)
+
+    def test_missing_objects_are_reported(self):
+        """Для несуществующих группы и пользователя возвращается код 404,
+        а для ленты подписок без авторизации — 401?
+        """
+        urls = (
+            (reverse('posts:api_group', args=['missing']), 404),
+            (reverse('posts:api_profile', args=['missing']), 404),
+            (reverse('posts:api_follow'), 401),
+        )
+        for url, status in urls:
+            with self.subTest(url=url):
+                response, data = self._get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', data)
+
+    @override_settings(POSTS_MAX_FOLLOWERS_FOR_FANOUT=1)
+    def test_follow_feed_merges_pushed_and_pulled_posts(self):
+        """Лента подписок содержит записи обычных и «тяжёлых» авторов?"""
+        heavy_author = User.objects.create_user(username='heavy-author')
+        other_user = User.objects.create_user(username='other-user')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=heavy_author)
+        Follow.objects.create(user=other_user, author=heavy_author)
+        for n in range(3):
+            Post.objects.create(author=heavy_author, text=f'Тяжёлая {n}.')
+        self.client.force_login(self.user)
+        results = self._read_feed(reverse('posts:api_follow'),
+                                  {'limit': 3, 'fields': 'id'})
+        self.assertEqual(
+            [post['id'] for post in results],
+            list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            ))
+        )
@@ -1,9 +1,22 @@
 """Тесты для проверки кэширования в приложении posts."""
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.http import HttpResponse
 from django.urls import reverse
 from django.core.cache import cache
 
 from users.models import User
-from posts.models import Post
+from posts.caching import (LocalPageCache, get_cache_stats, local_cache,
+                           get_page_timeouts, is_cache_shared,
+                           get_versions, group_page_scope,
+                           profile_page_scope)
+from posts.models import Post, Group, Follow, Comment
+from posts.constants import (INDEX_PAGE_CACHE_SOFT_TIMEOUT,
+                             INDEX_PAGE_CACHE_HARD_TIMEOUT,
+                             PROCESS_CACHE_SOFT_TIMEOUT,
+                             PROCESS_CACHE_HARD_TIMEOUT)
 from core.tests.utils import BaseTestCase
 
 
@@ -29,9 +42,558 @@ class CacheTestCase(BaseTestCase):
     def test_cach_works_properly(self):
         """Кэш работает правильно?"""
         old_content = self.client.get(reverse('posts:index')).content
-        Post.objects.filter(pk=self.post_other.pk).delete()
+        Post.objects.filter(pk=self.post_other.pk).update(text='Изменена.')
         new_content = self.client.get(reverse('posts:index')).content
         self.assertEqual(old_content, new_content)
         cache.clear()
         new_content = self.client.get(reverse('posts:index')).content
         self.assertNotEqual(old_content, new_content)
+
+    def test_cached_page_is_served_without_queries(self):
+        """Неизменённая главная страница отдаётся из кэша без запросов
+        к базе данных?
+        """
+        self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:index'))
+
+    def test_cache_is_invalidated_by_post_changes(self):
+        """Кэш главной страницы сбрасывается при изменении записей?"""
+        old_content = self.client.get(reverse('posts:index')).content
+        with self.run_on_commit_callbacks():
+            post = Post.objects.create(
+                author=self.author,
+                group=None,
+                text='Новая запись.',
+            )
+        new_content = self.client.get(reverse('posts:index')).content
+        self.assertIn(post.text.encode(), new_content)
+        with self.run_on_commit_callbacks():
+            post.delete()
+        self.assertEqual(self.client.get(reverse('posts:index')).content,
+                         old_content)
+
+
+class PostCardCacheTestCase(BaseTestCase):
+    """Набор тестов для проверки кэширования карточек записей."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.url = reverse('posts:profile', args=[cls.author.username])
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        with self.run_on_commit_callbacks():
+            self.post = Post.objects.create(
+                author=self.author,
+                group=None,
+                text='Тестовая запись.',
+            )
+        self.client.get(self.url)
+
+    def test_unchanged_card_is_served_from_cache(self):
+        """Карточка неизменённой записи берётся из кэша?"""
+        Post.objects.filter(pk=self.post.pk).update(text='Скрытый текст.')
+        content = self.client.get(self.url).content.decode()
+        self.assertIn('Тестовая запись.', content)
+        self.assertNotIn('Скрытый текст.', content)
+
+    def test_edited_card_is_rendered_again(self):
+        """Карточка изменённой записи формируется заново?"""
+        self.post.text = 'Изменённая запись.'
+        with self.run_on_commit_callbacks():
+            self.post.save()
+        content = self.client.get(self.url).content.decode()
+        self.assertIn('Изменённая запись.', content)
+        self.assertNotIn('Тестовая запись.', content)
+
+    def test_concurrent_edits_get_different_versions(self):
+        """Одновременные изменения записи получают разные версии?"""
+        post = Post.objects.get(pk=self.post.pk)
+        versions = []
+        for instance, text in ((self.post, 'Первое изменение.'),
+                               (post, 'Второе изменение.')):
+            instance.text = text
+            instance.save(update_fields=['text'])
+            versions.append(Post.objects.get(pk=post.pk).version)
+        self.assertEqual(versions, [1, 2])
+
+
+class ScopedPageCacheTestCase(BaseTestCase):
+    """Набор тестов для проверки кэширования страниц групп
+    и пользователей.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        cls.group_other = Group.objects.create(
+            title='Другая группа',
+            slug='test-other',
+            description='Другая группа записей',
+        )
+        cls.group_url = reverse('posts:group_list', args=[cls.group.slug])
+        cls.profile_url = reverse('posts:profile', args=[cls.author.username])
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        with self.run_on_commit_callbacks():
+            self.post = Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text='Тестовая запись.',
+            )
+
+    def _test_page_is_refreshed(self, url, change, text, shown):
+        """Изменение change сразу отражается на кэшированной странице url?"""
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.run_on_commit_callbacks():
+            change()
+        content = self.client.get(url).content.decode()
+        if shown:
+            self.assertIn(text, content)
+        else:
+            self.assertNotIn(text, content)
+
+    def test_pages_are_refreshed_on_post_creation(self):
+        """Страницы группы и автора обновляются при создании записи?"""
+        for url in (self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                self._test_page_is_refreshed(
+                    url,
+                    lambda: Post.objects.create(
+                        author=self.author, group=self.group,
+                        text=f'Запись для {url}.'
+                    ),
+                    f'Запись для {url}.', shown=True
+                )
+
+    def test_pages_are_refreshed_on_post_edit(self):
+        """Страницы группы и автора обновляются при изменении записи?"""
+        for url in (self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                def change():
+                    self.post.text = f'Изменено для {url}.'
+                    self.post.save(update_fields=['text'])
+                self._test_page_is_refreshed(
+                    url, change, f'Изменено для {url}.', shown=True
+                )
+
+    def test_group_page_is_refreshed_on_regroup(self):
+        """Страница группы обновляется при переносе записи в другую
+        группу?
+        """
+        def change():
+            self.post.group = self.group_other
+            self.post.save()
+        self._test_page_is_refreshed(
+            self.group_url, change, self.post.text, shown=False
+        )
+
+    def test_pages_are_refreshed_on_post_deletion(self):
+        """Страницы группы и автора обновляются при удалении записи?"""
+        for url in (self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                with self.run_on_commit_callbacks():
+                    post = Post.objects.create(
+                        author=self.author, group=self.group,
+                        text=f'Удаляемая запись для {url}.'
+                    )
+                self._test_page_is_refreshed(
+                    url, post.delete, post.text, shown=False
+                )
+
+    def test_profile_page_is_refreshed_on_following(self):
+        """Страница автора обновляется при подписке на него?"""
+        self._test_page_is_refreshed(
+            self.profile_url,
+            lambda: Follow.objects.create(user=self.user, author=self.author),
+            'Подписчиков: 1', shown=True
+        )
+
+    def test_uncommitted_changes_bypass_cache(self):
+        """Страница, изменённая ещё не зафиксированной транзакцией
+        запроса, формируется без кэша?
+        """
+        other_url = reverse('posts:group_list',
+                            args=[self.group_other.slug])
+        for url in (self.group_url, other_url):
+            self.client.get(url)
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Незафиксированная запись.')
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        self.assertContains(self.client.get(self.group_url),
+                            'Незафиксированная запись.')
+
+    def test_page_versions_change_after_commit(self):
+        """Версии страниц группы и автора меняются только после фиксации
+        транзакции, изменившей их содержимое?
+        """
+        group_scope = group_page_scope(self.group.slug)
+        profile_scope = profile_page_scope(self.author.username)
+
+        def rename_group():
+            group = Group.objects.get(pk=self.group.pk)
+            group.title = 'Новое название'
+            group.save()
+
+        changes = (
+            (lambda: Post.objects.create(author=self.author,
+                                         group=self.group, text='Ещё.'),
+             [group_scope, profile_scope]),
+            (lambda: Follow.objects.create(user=self.user,
+                                           author=self.author),
+             [profile_scope]),
+            (rename_group, [group_scope, profile_scope]),
+        )
+        for change, scopes in changes:
+            with self.subTest(scopes=scopes):
+                versions = get_versions(scopes)
+                with self.run_on_commit_callbacks():
+                    change()
+                    self.assertEqual(get_versions(scopes), versions)
+                for old, new in zip(versions, get_versions(scopes)):
+                    self.assertGreater(new, old)
+
+    def test_pages_are_refreshed_on_author_rename(self):
+        """Страницы и карточки обновляются при смене имени автора?"""
+        def rename():
+            author = User.objects.get(pk=self.author.pk)
+            author.first_name, author.last_name = 'Новое', 'Имя'
+            author.save()
+
+        for url in (reverse('posts:index'), self.group_url):
+            with self.subTest(url=url):
+                self._test_page_is_refreshed(url, rename, 'Новое Имя',
+                                             shown=True)
+
+    def test_pages_are_refreshed_on_group_slug_change(self):
+        """Страницы и карточки обновляются при смене идентификатора
+        группы?
+        """
+        def change_slug():
+            group = Group.objects.get(pk=self.group.pk)
+            group.slug = 'renamed'
+            group.save()
+
+        self._test_page_is_refreshed(
+            self.profile_url, change_slug,
+            reverse('posts:group_list', args=['renamed']), shown=True
+        )
+
+    def test_page_timeouts_are_limited_for_process_cache(self):
+        """Сроки хранения копий страниц ограничены, если кэш не общий
+        для процессов?
+        """
+        self.assertFalse(is_cache_shared())
+        self.assertEqual(
+            get_page_timeouts(INDEX_PAGE_CACHE_SOFT_TIMEOUT,
+                              INDEX_PAGE_CACHE_HARD_TIMEOUT),
+            (PROCESS_CACHE_SOFT_TIMEOUT, PROCESS_CACHE_HARD_TIMEOUT)
+        )
+
+
+class StaleWhileRevalidateTestCase(BaseTestCase):
+    """Набор тестов для проверки обновления устаревших копий страниц."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.url = reverse('posts:index')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        with self.run_on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Тестовая запись.')
+        self.client.get(self.url)
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Новая запись.')
+        ])
+
+    def _expire(self):
+        """Возвращает контекст, в котором копия страницы устарела."""
+        return mock.patch(
+            'posts.caching.time.time',
+            return_value=time.time() + get_page_timeouts(
+                INDEX_PAGE_CACHE_SOFT_TIMEOUT, INDEX_PAGE_CACHE_HARD_TIMEOUT
+            )[0] + 1
+        )
+
+    def test_stale_page_is_served_and_refreshed(self):
+        """Устаревшая копия страницы отдаётся сразу и обновляется после
+        отправки ответа?
+        """
+        with self._expire():
+            response = self.client.get(self.url)
+            self.assertNotContains(response, 'Новая запись.')
+            response = self.client.get(self.url)
+            self.assertContains(response, 'Новая запись.')
+
+    def test_fresh_page_is_not_refreshed(self):
+        """Свежая копия страницы не формируется заново?"""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertNotContains(response, 'Новая запись.')
+
+    def test_stale_page_is_refreshed_once(self):
+        """Устаревшая копия страницы не формируется заново, пока её
+        обновляет другой запрос?
+        """
+        with self._expire(), mock.patch(
+            'posts.caching.cache.add', return_value=False
+        ):
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url)
+            self.assertNotContains(response, 'Новая запись.')
+
+
+class PageRenderLockTestCase(BaseTestCase):
+    """Набор тестов для проверки того, что отсутствующую в кэше страницу
+    формирует только один запрос.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        Post.objects.create(author=cls.author, text='Тестовая запись.')
+        cls.url = reverse('posts:index')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.lock_keys = []
+
+    def _lock_is_held(self, key, *args):
+        """Имитирует блокировку key, удерживаемую другим запросом."""
+        self.lock_keys.append(key)
+        return False
+
+    def test_waiting_request_gets_rendered_page(self):
+        """Запрос, не получивший блокировку, дожидается копии страницы,
+        сформированной другим запросом?
+        """
+        def render_elsewhere(seconds):
+            key = self.lock_keys[0][:-len('.lock')]
+            cache.set(key, (time.time() + 60, HttpResponse('Копия из кэша.')))
+
+        with mock.patch('posts.caching.cache.add', self._lock_is_held), \
+                mock.patch('posts.caching.time.sleep', render_elsewhere), \
+                self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Копия из кэша.')
+
+    def test_request_renders_page_when_lock_is_released(self):
+        """Запрос формирует страницу сам, если блокировка снята без
+        сохранения копии?
+        """
+        with mock.patch('posts.caching.cache.add', self._lock_is_held), \
+                mock.patch('posts.caching.time.sleep'):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Тестовая запись.')
+        self.assertEqual(len(self.lock_keys), 1)
+
+
+class TwoTierCacheTestCase(BaseTestCase):
+    """Набор тестов для проверки кэша страниц в памяти процесса (L1)."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        Post.objects.create(author=cls.author, text='Тестовая запись.')
+        cls.url = reverse('posts:index')
+
+    def _get_stats_change(self, url):
+        """Возвращает изменение счётчиков попаданий и промахов кэшей
+        при обращении к странице url.
+        """
+        before = get_cache_stats()
+        self.client.get(url)
+        after = get_cache_stats()
+        return {
+            (tier, name): after[tier][name] - before[tier][name]
+            for tier in after for name in after[tier]
+        }
+
+    def test_hot_page_is_served_from_local_cache(self):
+        """Повторно запрошенная страница отдаётся из кэша L1?"""
+        self.client.get(self.url)
+        self.assertEqual(self._get_stats_change(self.url), {
+            ('l1', 'hits'): 1, ('l1', 'misses'): 0,
+            ('l2', 'hits'): 0, ('l2', 'misses'): 0,
+        })
+
+    def test_shared_copy_is_loaded_into_local_cache(self):
+        """Копия страницы из кэша L2 попадает в кэш L1?"""
+        self.client.get(self.url)
+        local_cache.clear()
+        self.assertEqual(self._get_stats_change(self.url), {
+            ('l1', 'hits'): 0, ('l1', 'misses'): 1,
+            ('l2', 'hits'): 1, ('l2', 'misses'): 0,
+        })
+        self.assertEqual(self._get_stats_change(self.url)['l1', 'hits'], 1)
+
+    def test_cache_stats_are_reported(self):
+        """Статистика кэшей передаётся в заголовке Server-Timing?"""
+        self.client.get(self.url)
+        timing = self.client.get(self.url)['Server-Timing']
+        stats = get_cache_stats()
+        self.assertTrue(timing.startswith('page-cache;dur='))
+        self.assertIn(
+            f'l1_hits={stats["l1"]["hits"]} '
+            f'l1_misses={stats["l1"]["misses"]} '
+            f'l2_hits={stats["l2"]["hits"]} '
+            f'l2_misses={stats["l2"]["misses"]}"', timing
+        )
+
+    def test_local_copy_is_invalidated_by_version(self):
+        """Копия страницы в кэше L1 не отдаётся после изменения записей?"""
+        self.client.get(self.url)
+        with self.run_on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Новая запись.')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новая запись.')
+
+    def test_local_cache_evicts_least_recently_used(self):
+        """Из кэша L1 вытесняются давно запрошенные копии страниц?"""
+        cache = LocalPageCache(max_entries=2)
+        fresh_until = time.time() + 60
+        for key in ('a', 'b'):
+            cache.set(key, fresh_until, HttpResponse(key))
+        cache.get('a')
+        cache.set('c', fresh_until, HttpResponse('c'))
+        self.assertIsNone(cache.get('b'))
+        _, response = cache.get('a')
+        self.assertEqual(response.content, b'a')
+
+
+class ConditionalGetTestCase(BaseTestCase):
+    """Набор тестов для проверки ответов на условные запросы."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        with self.run_on_commit_callbacks():
+            self.post = Post.objects.create(
+                author=self.author, group=self.group, text='Тестовая запись.'
+            )
+        self.page_urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        self.post_url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def _get_etag(self, url):
+        """Возвращает ETag страницы url."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.has_header('ETag'))
+        return response['ETag']
+
+    def _get_status(self, url, etag):
+        """Возвращает код ответа на условный запрос страницы url."""
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_pages_are_not_sent_again(self):
+        """На условный запрос неизменённой страницы ответ 304 выдаётся
+        без обращения к базе данных?
+        """
+        for url in self.page_urls:
+            with self.subTest(url=url):
+                etag = self._get_etag(url)
+                with self.assertNumQueries(0):
+                    status = self._get_status(url, etag)
+                self.assertEqual(status, HTTPStatus.NOT_MODIFIED)
+
+    def test_unchanged_post_page_is_not_sent_again(self):
+        """На условный запрос неизменённой страницы записи ответ 304
+        выдаётся одним запросом к базе данных?
+        """
+        etag = self._get_etag(self.post_url)
+        with self.assertNumQueries(1):
+            status = self._get_status(self.post_url, etag)
+        self.assertEqual(status, HTTPStatus.NOT_MODIFIED)
+
+    def test_pages_are_sent_again_without_shared_cache(self):
+        """Без общего для процессов кэша страницы отправляются полностью
+        по истечении срока хранения их копий?
+        """
+        self.assertFalse(is_cache_shared())
+        urls = (*self.page_urls, self.post_url)
+        etags = {url: self._get_etag(url) for url in urls}
+        with mock.patch(
+            'posts.caching.time.time',
+            return_value=time.time() + PROCESS_CACHE_HARD_TIMEOUT
+        ):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self._get_status(url, etags[url]),
+                                     HTTPStatus.OK)
+
+    def test_changed_pages_are_sent_again(self):
+        """После изменения записи страницы отправляются полностью?"""
+        urls = (*self.page_urls, self.post_url)
+        etags = {url: self._get_etag(url) for url in urls}
+        self.post.text = 'Изменённая запись.'
+        with self.run_on_commit_callbacks():
+            self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self._get_status(url, etags[url]),
+                                 HTTPStatus.OK)
+
+    def test_post_page_is_sent_again_after_comment(self):
+        """После добавления комментария страница записи отправляется
+        полностью?
+        """
+        etag = self._get_etag(self.post_url)
+        Comment.objects.create(author=self.user, post=self.post, text='Ок.')
+        self.assertEqual(self._get_status(self.post_url, etag),
+                         HTTPStatus.OK)
+
+    def test_pages_are_sent_to_other_user(self):
+        """Страницы, полученные одним пользователем, отправляются другому
+        полностью?
+        """
+        urls = (*self.page_urls, self.post_url)
+        etags = {url: self._get_etag(url) for url in urls}
+        self.client.force_login(self.user)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self._get_status(url, etags[url]),
+                                 HTTPStatus.OK)
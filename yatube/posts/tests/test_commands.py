@@ -0,0 +1,258 @@
+"""Тесты для проверки команд управления приложения posts."""
+import csv
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import (Post, Group, Comment, Follow, AuthorStats,
+                          TimelineEntry)
+from posts.search import filter_matching
+
+
+class BenchCacheCompressionTestCase(BaseTestCase):
+    """Набор тестов для проверки команды bench_cache_compression."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        author = User.objects.create_user(username='test-author')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        for n in range(10):
+            Post.objects.create(author=author, group=group,
+                                text=f'Запись №{n}.')
+
+    def test_compression_is_measured_on_feed_pages(self):
+        """Команда измеряет сжатие главной страницы, страниц групп
+        и пользователей на каждом уровне?
+        """
+        out = StringIO()
+        call_command('bench_cache_compression', '--repeat=1',
+                     '--levels', '1', '9', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Страниц: 3', output)
+        for name in ('нет', 'zlib-1', 'zlib-9'):
+            self.assertIn(name, output)
+
+
+class RebuildAuthorStatsTestCase(BaseTestCase):
+    """Набор тестов для проверки команды rebuild_author_stats."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        Post.objects.create(author=cls.author, text='Запись.')
+
+    def test_drift_is_reported_by_check(self):
+        """Команда с --check сообщает о расхождениях, не исправляя их?"""
+        AuthorStats.objects.filter(user=self.author).update(posts_count=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_author_stats', '--check', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 5
+        )
+
+    def test_drift_is_fixed(self):
+        """Команда исправляет расходящуюся и отсутствующую статистику?"""
+        AuthorStats.objects.filter(user=self.author).update(posts_count=5)
+        other = User.objects.create_user(username='test-other')
+        AuthorStats.objects.filter(user=other).delete()
+        out = StringIO()
+        call_command('rebuild_author_stats', stdout=out)
+        self.assertIn('Исправлено расхождений: 2', out.getvalue())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertTrue(AuthorStats.objects.filter(user=other).exists())
+        call_command('rebuild_author_stats', '--check', stdout=StringIO())
+
+
+class ImportPostsTestCase(BaseTestCase):
+    """Набор тестов для проверки команды import_posts."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.follower = User.objects.create_user(username='test-follower')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _write_jsonl(self, name, rows):
+        """Записывает строки rows в файл JSON Lines и возвращает путь к нему.
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def _write_csv(self, name, rows):
+        """Записывает строки rows в файл CSV и возвращает путь к нему."""
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def _import(self, path, *args):
+        """Выполняет импорт файла path и возвращает вывод команды."""
+        out = StringIO()
+        call_command('import_posts', path, '--batch-size=2',
+                     '--chunk-size=3', *args, stdout=out)
+        return out.getvalue()
+
+    def test_posts_are_imported_with_derived_data(self):
+        """Импортированные записи сохраняют даты публикации, попадают
+        в поиск, ленты подписчиков, статистику автора и на кэшированные
+        страницы?
+        """
+        self.client.get(reverse('posts:index'))
+        rows = [
+            {'author': 'test-author', 'text': f'Импортированная {n}.',
+             'group': 'test' if n % 2 else '',
+             'pub_date': f'2020-01-0{n + 1}T12:00:00'}
+            for n in range(5)
+        ]
+        rows.append({'author': 'missing', 'text': 'Без автора.'})
+        rows.append({'author': 'test-author', 'text': 'Дата.',
+                     'pub_date': 'вчера'})
+        with self.run_on_commit_callbacks():
+            output = self._import(self._write_jsonl('posts.jsonl', rows))
+
+        self.assertIn('Импортировано строк: 5, пропущено: 2', output)
+        self.assertIn('строк/с', output)
+        posts = Post.objects.filter(author=self.author).order_by('pub_date')
+        self.assertEqual(posts.count(), 5)
+        self.assertEqual(
+            posts.first().pub_date,
+            timezone.make_aware(datetime(2020, 1, 1, 12))
+        )
+        self.assertEqual(posts.filter(group=self.group).count(), 2)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertEqual(
+            filter_matching(Post.objects.all(), 'импортированная').count(), 5
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 5
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 5
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        self.assertContains(response, 'Импортированная 4.')
+
+    def test_import_of_posts_with_ids_can_be_repeated(self):
+        """Повторный импорт записей с id не создаёт дубликатов?"""
+        rows = [{'id': 100 + n, 'author': 'test-author',
+                 'text': f'Запись {n}.'} for n in range(4)]
+        path = self._write_csv('posts.csv', rows)
+        self._import(path)
+        output = self._import(path)
+        self.assertIn('Импортировано строк: 0, пропущено: 4', output)
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            [100, 101, 102, 103]
+        )
+        self.assertEqual(Post.objects.create(author=self.author,
+                                             text='Новая.').pk, 104)
+
+    def test_imported_posts_do_not_reuse_ids(self):
+        """Импортированным записям не назначаются id удалённых записей,
+        а существующие записи импортом не затрагиваются?
+        """
+        kept = Post.objects.create(author=self.author, text='Оставлена.')
+        deleted = Post.objects.create(author=self.author, text='Удалена.')
+        deleted_id = deleted.pk
+        deleted.delete()
+        TimelineEntry.objects.filter(post=kept).delete()
+        self._import(self._write_jsonl(
+            'posts.jsonl', [{'author': 'test-author', 'text': 'Новая.'}]
+        ))
+        self.assertGreater(Post.objects.get(text='Новая.').pk, deleted_id)
+        self.assertFalse(TimelineEntry.objects.filter(post=kept).exists())
+
+    def test_default_batches_fit_database_limits(self):
+        """Импорт с параметрами по умолчанию не превышает ограничений
+        базы данных на размер запроса?
+        """
+        start = timezone.make_aware(datetime(2020, 1, 1))
+        pub_dates = [start + timedelta(minutes=n) for n in range(600)]
+        rows = [{'author': 'test-author', 'text': f'Запись {n}.',
+                 'pub_date': pub_date.isoformat()}
+                for n, pub_date in enumerate(pub_dates)]
+        out = StringIO()
+        call_command('import_posts', self._write_jsonl('posts.jsonl', rows),
+                     stdout=out)
+        self.assertIn('Импортировано строк: 600, пропущено: 0',
+                      out.getvalue())
+        self.assertEqual(
+            list(Post.objects.order_by('pub_date').values_list(
+                'pub_date', flat=True
+            )),
+            pub_dates
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 600
+        )
+
+    def test_comments_are_imported_with_counts(self):
+        """Импортированные комментарии учитываются в количестве
+        комментариев к записям, а комментарии к несуществующим записям
+        пропускаются?
+        """
+        post = Post.objects.create(author=self.author, text='Запись.')
+        rows = [
+            {'author': 'test-follower', 'post': post.pk,
+             'text': f'Комментарий {n}.',
+             'pub_date': f'2021-0{n + 1}-01T00:00:00+00:00'}
+            for n in range(4)
+        ]
+        rows.append({'author': 'test-follower', 'post': post.pk + 1,
+                     'text': 'К несуществующей записи.'})
+        output = self._import(self._write_jsonl('comments.jsonl', rows),
+                              '--model=comment')
+        self.assertIn('Импортировано строк: 4, пропущено: 1', output)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 4)
+        self.assertEqual(post.last_comment_at,
+                         Comment.objects.latest('pub_date').pub_date)
+        self.assertEqual(post.last_comment_at.year, 2021)
+
+    def test_malformed_file_is_rejected(self):
+        """Некорректный файл JSON Lines приводит к ошибке команды?"""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"author": "test-author", "text": "Запись."}\n[1]\n')
+        with self.assertRaises(CommandError):
+            self._import(path)
+        with self.assertRaises(CommandError):
+            self._import(os.path.join(self.directory, 'missing.jsonl'))
@@ -0,0 +1,110 @@
+"""Тесты для проверки счётчиков записей в лентах приложения posts."""
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts import counters
+from posts.models import Post, Group, Follow
+
+
+class PostsCountTestCase(BaseTestCase):
+    """Набор тестов для проверки поддержания счётчиков записей."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        cls.group_other = Group.objects.create(
+            title='Другая группа',
+            slug='test-other',
+            description='Другая группа записей',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(author=cls.author, group=cls.group, text='Запись.')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.querysets = {
+            counters.ALL_POSTS_SCOPE: Post.objects.all(),
+            counters.group_scope(self.group.pk): self.group.posts.all(),
+            counters.group_scope(self.group_other.pk):
+                self.group_other.posts.all(),
+            counters.author_scope(self.author.pk): self.author.posts.all(),
+            counters.follower_scope(self.user.pk): Post.objects.filter(
+                author__following__user=self.user
+            ),
+        }
+        for scope, posts in self.querysets.items():
+            counters.get_posts_count(scope, posts)
+
+    def _test_counters_are_correct(self):
+        """Значения счётчиков совпадают с количеством записей в лентах?"""
+        for scope, posts in self.querysets.items():
+            with self.subTest(scope=scope):
+                self.assertEqual(
+                    counters.get_posts_count(scope, Post.objects.none()),
+                    posts.count()
+                )
+
+    def test_counters_follow_post_creation(self):
+        """Счётчики учитывают создание записи?"""
+        with self.run_on_commit_callbacks():
+            Post.objects.create(author=self.author, group=self.group,
+                                text='Ещё.')
+        self._test_counters_are_correct()
+
+    def test_counters_follow_post_deletion(self):
+        """Счётчики учитывают удаление записи?"""
+        with self.run_on_commit_callbacks():
+            self.author.posts.all().delete()
+        self._test_counters_are_correct()
+
+    def test_counters_follow_group_change(self):
+        """Счётчики учитывают перенос записи в другую группу?"""
+        post = self.author.posts.get()
+        post.group = self.group_other
+        with self.run_on_commit_callbacks():
+            post.save()
+        self._test_counters_are_correct()
+
+    def test_counters_follow_unfollowing(self):
+        """Счётчик ленты подписок учитывает отмену подписки?"""
+        with self.run_on_commit_callbacks():
+            Follow.objects.filter(user=self.user).delete()
+        self._test_counters_are_correct()
+
+    def test_rolled_back_changes_are_not_counted(self):
+        """Изменения, отменённые откатом транзакции, не учитываются
+        в счётчиках?
+        """
+        with self.run_on_commit_callbacks():
+            try:
+                with transaction.atomic():
+                    Post.objects.create(author=self.author, group=self.group,
+                                        text='Ещё.')
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self._test_counters_are_correct()
+
+    def test_profile_page_does_not_count_posts(self):
+        """Страница автора не выполняет подсчёт его записей?"""
+        url = reverse('posts:profile', args=[self.author.username])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        posts_count_queries = [
+            query['sql'] for query in queries
+            if 'COUNT(' in query['sql'] and 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(posts_count_queries, [])
@@ -0,0 +1,86 @@
+"""Тесты для проверки выгрузки персональных данных пользователя."""
+import io
+import json
+import zipfile
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from users.models import User
+from posts.models import Post, Comment
+from posts.tests.utils import BaseTestCaseWithUploadedFiles
+
+
+class ExportTestCase(BaseTestCaseWithUploadedFiles):
+    """Набор тестов для проверки выгрузки персональных данных
+    пользователя.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.other_user = User.objects.create_user(username='other-user')
+        cls.post_with_image = Post.objects.create(
+            author=cls.user, text='Запись с картинкой.',
+            image=cls.create_uploaded_gif('export.gif'),
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Запись.')
+        cls.other_post = Post.objects.create(author=cls.other_user,
+                                             text='Чужая запись.')
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.other_post, text='Комментарий.'
+        )
+        Comment.objects.create(author=cls.other_user, post=cls.post,
+                               text='Чужой комментарий.')
+        cls.url = reverse('posts:export_data')
+
+    def _get_archive(self):
+        """Возвращает архив с данными пользователя."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('yatube-test-user.zip',
+                      response['Content-Disposition'])
+        content = b''.join(response.streaming_content)
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def _read_jsonl(self, archive, name):
+        """Возвращает список объектов из файла JSON Lines архива."""
+        return [json.loads(line)
+                for line in archive.read(name).decode().splitlines()]
+
+    def test_export_requires_login(self):
+        """Анонимный пользователь перенаправляется на страницу входа?"""
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.url}'
+        )
+
+    def test_archive_contains_only_user_data(self):
+        """Архив содержит сведения о пользователе, его записи,
+        комментарии и изображения, но не чужие данные?
+        """
+        archive = self._get_archive()
+        self.assertIsNone(archive.testzip())
+        profile = json.loads(archive.read('profile.json'))
+        self.assertEqual(profile['username'], self.user.username)
+        posts = self._read_jsonl(archive, 'posts.jsonl')
+        self.assertEqual([post['id'] for post in posts],
+                         [self.post_with_image.pk, self.post.pk])
+        self.assertEqual(posts[1]['text'], self.post.text)
+        self.assertIsNone(posts[1]['image'])
+        comments = self._read_jsonl(archive, 'comments.jsonl')
+        self.assertEqual(comments, [{
+            'id': self.comment.pk,
+            'pub_date': comments[0]['pub_date'],
+            'text': self.comment.text,
+            'post': self.other_post.pk,
+        }])
+        image_name = posts[0]['image']
+        self.assertEqual(image_name,
+                         f'images/{self.post_with_image.image.name}')
+        self.assertEqual(archive.read(image_name), self.small_gif)
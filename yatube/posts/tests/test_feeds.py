@@ -0,0 +1,107 @@
+"""Тесты для проверки лент записей в форматах RSS и Atom."""
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post, Group
+
+
+class FeedsTestCase(BaseTestCase):
+    """Набор тестов для проверки лент записей в форматах RSS и Atom."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовая запись.'
+        )
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.feed_urls = {
+            reverse('posts:feed_rss'): 'application/rss+xml',
+            reverse('posts:feed_atom'): 'application/atom+xml',
+            reverse('posts:group_feed_rss', args=[self.group.slug]):
+                'application/rss+xml',
+            reverse('posts:group_feed_atom', args=[self.group.slug]):
+                'application/atom+xml',
+            reverse('posts:profile_feed_rss', args=[self.author.username]):
+                'application/rss+xml',
+            reverse('posts:profile_feed_atom', args=[self.author.username]):
+                'application/atom+xml',
+        }
+
+    def test_feeds_contain_posts(self):
+        """Ленты отдаются в нужном формате и содержат записи?"""
+        for url, content_type in self.feed_urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type)
+                )
+                self.assertContains(response, self.post.text)
+                self.assertContains(
+                    response,
+                    reverse('posts:post_detail', args=[self.post.pk])
+                )
+
+    def test_missing_objects_feeds_are_not_found(self):
+        """Для несуществующих группы и пользователя ленты не найдены?"""
+        for url in (reverse('posts:group_feed_rss', args=['missing']),
+                    reverse('posts:profile_feed_atom', args=['missing'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.NOT_FOUND)
+
+    def test_feeds_are_served_from_shared_cache(self):
+        """Неизменённые ленты отдаются из кэша без запросов к базе данных
+        независимо от cookie?
+        """
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('Vary'))
+                with self.assertNumQueries(0):
+                    self.client.get(url, HTTP_COOKIE='sessionid=other')
+
+    def test_feeds_are_updated_with_new_posts(self):
+        """Ленты обновляются при публикации новой записи?"""
+        for url in self.feed_urls:
+            self.client.get(url)
+        with self.run_on_commit_callbacks():
+            post = Post.objects.create(
+                author=self.author, group=self.group, text='Новая запись.'
+            )
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), post.text)
+
+    def test_unchanged_feeds_are_not_sent_again(self):
+        """На опрос неизменённой ленты с ETag отвечается кодом 304,
+        а после публикации записи — новой лентой?
+        """
+        etags = {url: self.client.get(url)['ETag'] for url in self.feed_urls}
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+        with self.run_on_commit_callbacks():
+            Post.objects.create(
+                author=self.author, group=self.group, text='Новая запись.'
+            )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
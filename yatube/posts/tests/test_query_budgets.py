@@ -0,0 +1,113 @@
+"""Тесты для проверки бюджетов запросов view-функций приложения posts."""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post, Group, Follow, Comment
+from posts.constants import NUMBER_OF_POSTS_ON_MAIN_PAGE
+from posts.utils import make_cursor
+
+
+class QueryBudgetTestCase(BaseTestCase):
+    """Набор тестов для проверки того, что страницы укладываются в бюджеты
+    запросов и количество запросов не растёт вместе с объёмом данных.
+    """
+
+    DATASET_SIZES = (1, 2 * NUMBER_OF_POSTS_ON_MAIN_PAGE + 1)
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'test-author-{n}')
+            for n in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.post = Post.objects.create(
+            author=cls.authors[0], group=cls.group, text='Комментируемая.'
+        )
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.client.force_login(self.user)
+        self.urls = (
+            (reverse('posts:index'), {}),
+            (reverse('posts:index'), {'page': 2}),
+            (reverse('posts:group_list', args=[self.group.slug]), {}),
+            (reverse('posts:group_list', args=[self.group.slug]),
+             {'page': 2}),
+            (reverse('posts:profile', args=[self.authors[0].username]), {}),
+            (reverse('posts:follow_index'), {}),
+            (reverse('posts:follow_index'), {'page': 2}),
+            (reverse('posts:post_detail', args=[self.post.pk]), {}),
+            (reverse('posts:post_comments', args=[self.post.pk]),
+             {'after': make_cursor(timezone.now() + timedelta(days=1), 0)}),
+            (reverse('posts:search'), {'q': 'Запись'}),
+        )
+
+    def _fill_dataset(self, size):
+        """Доводит количество записей каждого автора и комментариев
+        к записи до size.
+        """
+        for author in self.authors:
+            for n in range(author.posts.count(), size):
+                Post.objects.create(
+                    author=author, group=self.group, text=f'Запись №{n}.'
+                )
+            for n in range(self.post.comments.filter(author=author).count(),
+                           size):
+                Comment.objects.create(
+                    author=author, post=self.post, text=f'Комментарий №{n}.'
+                )
+
+    def _count_queries(self, url, params):
+        """Возвращает количество запросов при обращении к странице url
+        с параметрами params и холодным кэшем.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, params)
+        return len(queries)
+
+    def test_feed_views_have_query_budgets(self):
+        """Для view-функций страниц с лентами заданы бюджеты запросов?"""
+        for url, _ in self.urls:
+            with self.subTest(url=url):
+                self.assertTrue(hasattr(resolve(url).func, 'query_budget'))
+
+    def test_feed_views_stay_within_query_budgets(self):
+        """Страницы укладываются в бюджеты запросов при любом объёме
+        данных?
+        """
+        query_counts = {}
+        for size in self.DATASET_SIZES:
+            self._fill_dataset(size)
+            for url, params in self.urls:
+                with self.subTest(url=url, params=params, size=size):
+                    budget = resolve(url).func.query_budget
+                    count = self._count_queries(url, params)
+                    self.assertLessEqual(count, budget)
+                    key = (url, tuple(params.items()))
+                    query_counts.setdefault(key, set()).add(count)
+
+        for (url, params), counts in query_counts.items():
+            with self.subTest(url=url, params=params):
+                self.assertEqual(
+                    len(counts), 1,
+                    'Количество запросов зависит от объёма данных'
+                )
@@ -0,0 +1,93 @@
+"""Тесты для проверки планов запросов страниц приложения posts."""
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post, Group, Comment, Follow
+from posts.utils import encode_cursor
+
+
+def is_full_scan(step):
+    """Шаг плана запроса step — полный просмотр таблицы?"""
+    words = step.split()
+    return 'SCAN' in words and 'USING' not in words
+
+
+def is_temp_sort(step):
+    """Шаг плана запроса step — сортировка во временном B-дереве?"""
+    return 'TEMP B-TREE' in step
+
+
+class QueryPlanTestCase(BaseTestCase):
+    """Набор тестов для проверки того, что запросы страниц с лентами
+    используют индексы.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Запись.'
+        )
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.post, text='Ок.'
+        )
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def _get_query_plans(self, url, params=None):
+        """Возвращает планы всех запросов SELECT, выполненных при обращении
+        к странице url.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url, params)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы страниц не выполняют полный просмотр таблиц
+        и сортировку во временном B-дереве?
+        """
+        urls = (
+            (reverse('posts:index'), None),
+            (reverse('posts:index'), {'page': 1}),
+            (reverse('posts:group_list', args=[self.group.slug]), None),
+            (reverse('posts:group_list', args=[self.group.slug]),
+             {'page': 1}),
+            (reverse('posts:profile', args=[self.author.username]), None),
+            (reverse('posts:profile', args=[self.author.username]),
+             {'page': 1}),
+            (reverse('posts:follow_index'), None),
+            (reverse('posts:post_detail', args=[self.post.pk]), None),
+            (reverse('posts:post_comments', args=[self.post.pk]),
+             {'after': encode_cursor(self.comment)}),
+        )
+        for url, params in urls:
+            for sql, plan in self._get_query_plans(url, params).items():
+                with self.subTest(url=url, params=params, sql=sql):
+                    for step in plan:
+                        self.assertFalse(is_full_scan(step), plan)
+                        self.assertFalse(is_temp_sort(step), plan)
@@ -0,0 +1,117 @@
+"""Тесты для проверки полнотекстового поиска записей."""
+from django.contrib.admin.sites import site
+from django.test import RequestFactory
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post
+from posts.search import rebuild_index
+from posts.constants import NUMBER_OF_POSTS_ON_SEARCH_PAGE
+
+
+class SearchTestCase(BaseTestCase):
+    """Набор тестов для проверки полнотекстового поиска записей."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.url = reverse('posts:search')
+
+    def _search(self, query):
+        """Возвращает id записей, найденных по тексту query, со всех
+        страниц результатов поиска.
+        """
+        page_obj = self.client.get(self.url, {'q': query}).context['page_obj']
+        ids = [post.pk for post in page_obj]
+        while page_obj.has_next():
+            page_obj = self.client.get(self.url, {
+                'q': query, 'after': page_obj.next_cursor
+            }).context['page_obj']
+            ids.extend(post.pk for post in page_obj)
+        return ids
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит записи, содержащие все слова запроса или слова,
+        начинающиеся с них, без учёта регистра?
+        """
+        found = Post.objects.create(author=self.author,
+                                    text='Кошки любят молоко.')
+        Post.objects.create(author=self.author, text='Собаки любят кости.')
+        self.assertEqual(self._search('кошк ЛЮБЯТ'), [found.pk])
+        self.assertEqual(self._search('кошки собаки'), [])
+
+    def test_search_ranks_and_paginates_results(self):
+        """Результаты упорядочены по релевантности и выдаются по курсору
+        без пропусков и повторов?
+        """
+        total = 2 * NUMBER_OF_POSTS_ON_SEARCH_PAGE + 3
+        posts = [
+            Post.objects.create(author=self.author,
+                                text=f'Запись {n} ' + 'море ' * (n % 3 + 1))
+            for n in range(total)
+        ]
+        ids = self._search('море')
+        self.assertEqual(sorted(ids), sorted(post.pk for post in posts))
+        repeats = {post.pk: post.text.count('море') for post in posts}
+        self.assertEqual(repeats[ids[0]], 3)
+        self.assertEqual(repeats[ids[-1]], 1)
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении записей?"""
+        post = Post.objects.create(author=self.author, text='Старый текст.')
+        post.text = 'Новый текст.'
+        post.save()
+        self.assertEqual(self._search('старый'), [])
+        self.assertEqual(self._search('новый'), [post.pk])
+        post.delete()
+        self.assertEqual(self._search('новый'), [])
+
+    def test_rebuild_index_covers_bulk_created_posts(self):
+        """rebuild_index() добавляет в индекс записи, созданные
+        без сигналов?
+        """
+        Post.objects.bulk_create(
+            [Post(author=self.author, text='Импортированная запись.')]
+        )
+        self.assertEqual(self._search('импорт'), [])
+        rebuild_index()
+        self.assertEqual(self._search('импорт'),
+                         [Post.objects.get(text__startswith='Импорт').pk])
+
+    def test_query_syntax_is_ignored(self):
+        """Операторы FTS5 и кавычки в запросе не приводят к ошибке?"""
+        Post.objects.create(author=self.author, text='Запись NEAR "кавычки"')
+        for query in ('"', 'NEAR(', 'AND', '*', '-', ''):
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_invalid_cursor_is_ignored(self):
+        """Некорректный курсор приводит к первой странице результатов?"""
+        post = Post.objects.create(author=self.author, text='Запись.')
+        for cursor in ('x', '1_x', 'nan_1', 'inf_1'):
+            with self.subTest(cursor=cursor):
+                page_obj = self.client.get(
+                    self.url, {'q': 'запись', 'after': cursor}
+                ).context['page_obj']
+                self.assertEqual([item.pk for item in page_obj], [post.pk])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в интерфейсе администратора использует индекс?"""
+        found = [
+            Post.objects.create(author=self.author,
+                                text=f'Кошка {n} любит молоко.')
+            for n in range(3)
+        ]
+        Post.objects.create(author=self.author, text='Собаки любят кости.')
+        model_admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, use_distinct = model_admin.get_search_results(
+            request, Post.objects.all(), 'молок'
+        )
+        self.assertCountEqual(queryset, found)
+        self.assertFalse(use_distinct)
+        self.assertIn('MATCH', str(queryset.query))
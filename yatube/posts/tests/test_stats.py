@@ -0,0 +1,190 @@
+"""Тесты для проверки статистики пользователей и записей."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.forms import PostForm
+from posts.models import Post, Comment, Follow, AuthorStats
+
+
+class AuthorStatsTestCase(BaseTestCase):
+    """Набор тестов для проверки поддержания статистики пользователей."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _test_stats_are_correct(self):
+        """Статистика совпадает с данными базы?"""
+        for user in (self.author, self.user):
+            with self.subTest(user=user.username):
+                stats = AuthorStats.objects.get(user=user)
+                self.assertEqual(stats.posts_count, user.posts.count())
+                self.assertEqual(stats.followers_count,
+                                 user.following.count())
+                self.assertEqual(stats.following_count,
+                                 user.follower.count())
+
+    def test_stats_follow_post_changes(self):
+        """Статистика учитывает создание и удаление записей?"""
+        self.client.post(reverse('posts:post_create'),
+                         data={'text': 'Новая запись.'})
+        self._test_stats_are_correct()
+        post = Post.objects.create(author=self.author, text='Запись.')
+        self._test_stats_are_correct()
+        post.delete()
+        self._test_stats_are_correct()
+
+    def test_stats_follow_subscriptions(self):
+        """Статистика учитывает подписку и отписку?"""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self._test_stats_are_correct()
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self._test_stats_are_correct()
+
+    def test_stats_follow_user_deletion(self):
+        """Пользователь с записями, комментариями и подписками удаляется,
+        а статистика остальных пользователей учитывает удаление?
+        """
+        post = Post.objects.create(author=self.author, text='Запись.')
+        Post.objects.create(author=self.user, text='Другая запись.')
+        Comment.objects.create(author=self.author, post=post, text='Да.')
+        Comment.objects.create(author=self.user, post=post, text='Нет.')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.author, author=self.user)
+        User.objects.get(pk=self.author.pk).delete()
+        self.assertFalse(AuthorStats.objects.filter(
+            user_id=self.author.pk
+        ).exists())
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 0, 0)
+        )
+
+    def test_pages_do_not_count_rows(self):
+        """Страницы пользователя и записи не подсчитывают записи
+        и подписки запросами COUNT?
+        """
+        post = Post.objects.create(author=self.author, text='Запись.')
+        Follow.objects.create(user=self.user, author=self.author)
+        for url in (reverse('posts:profile', args=[self.author.username]),
+                    reverse('posts:post_detail', args=[post.pk])):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, 'Всего постов')
+                for query in queries:
+                    self.assertNotIn('"__count"', query['sql'])
+
+    def test_profile_shows_stats(self):
+        """Страница пользователя показывает его статистику?"""
+        Post.objects.create(author=self.author, text='Запись.')
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertContains(response, 'Всего постов: 1')
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Подписок: 0')
+
+
+class CommentsCountTestCase(BaseTestCase):
+    """Набор тестов для проверки поддержания количества комментариев
+    к записям и времени последнего комментария.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(author=self.author, text='Запись.')
+
+    def _add_comment(self, text):
+        """Добавляет комментарий text к записи и возвращает его."""
+        self.client.post(reverse('posts:add_comment', args=[self.post.pk]),
+                         data={'text': text})
+        return Comment.objects.get(text=text)
+
+    def _test_post_has(self, comments_count, last_comment_at):
+        """Запись хранит заданные количество комментариев и время
+        последнего комментария?
+        """
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, comments_count)
+        self.assertEqual(self.post.last_comment_at, last_comment_at)
+
+    def test_comments_are_counted(self):
+        """Добавление и удаление комментариев учитывается в записи?"""
+        first = self._add_comment('Первый.')
+        second = self._add_comment('Второй.')
+        self._test_post_has(2, second.pub_date)
+        second.delete()
+        self._test_post_has(1, first.pub_date)
+        first.delete()
+        self._test_post_has(0, None)
+
+    def test_post_edit_keeps_comments_count(self):
+        """Изменение записи по полям формы не затирает количество
+        комментариев, учтённых после её загрузки?
+        """
+        post = Post.objects.get(pk=self.post.pk)
+        comment = self._add_comment('Комментарий.')
+        post.text = 'Изменённая запись.'
+        post.save(update_fields=PostForm.Meta.fields)
+        self._test_post_has(1, comment.pub_date)
+
+    def test_post_edit_page_keeps_comments_count(self):
+        """Страница редактирования записи не записывает количество
+        комментариев?
+        """
+        self._add_comment('Комментарий.')
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse('posts:post_edit', args=[self.post.pk]),
+                data={'text': 'Изменённая запись.'},
+            )
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "posts_post"')]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn('"comments_count"', sql)
+        self._test_post_has(1, Comment.objects.get().pub_date)
+        self.assertEqual(self.post.text, 'Изменённая запись.')
+
+    def test_deleted_post_is_saved_again(self):
+        """Сохранение удалённой записи создаёт её заново?"""
+        post = Post.objects.get(pk=self.post.pk)
+        Post.objects.filter(pk=post.pk).delete()
+        post.save()
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_feed_shows_comments_count(self):
+        """Лента показывает актуальное количество комментариев?"""
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Комментариев: 0')
+        with self.run_on_commit_callbacks():
+            self._add_comment('Комментарий.')
+        self.assertContains(self.client.get(url), 'Комментариев: 1')
@@ -0,0 +1,142 @@
+"""Тесты для проверки лент подписок приложения posts."""
+import json
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import BaseTestCase
+from users.models import User
+from posts.models import Post, Follow, TimelineEntry
+
+
+class TimelineTestCase(BaseTestCase):
+    """Набор тестов для проверки заполнения лент подписок."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.author_other = User.objects.create_user(username='other-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старая.')
+        Post.objects.create(author=cls.author_other, text='Чужая запись.')
+
+    def _get_timeline_post_ids(self):
+        """Возвращает множество id записей в ленте пользователя."""
+        return set(TimelineEntry.objects.filter(
+            user=self.user
+        ).values_list('post_id', flat=True))
+
+    def test_following_fills_timeline(self):
+        """Подписка добавляет в ленту ранее опубликованные записи автора?"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self._get_timeline_post_ids(), {self.old_post.pk})
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новая запись попадает в ленты подписчиков автора?"""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новая.')
+        self.assertEqual(self._get_timeline_post_ids(),
+                         {self.old_post.pk, post.pk})
+
+    def test_unfollowing_clears_timeline(self):
+        """Отмена подписки удаляет записи автора из ленты?"""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author_other)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(
+            self._get_timeline_post_ids(),
+            set(self.author_other.posts.values_list('pk', flat=True))
+        )
+
+    def test_follow_index_reads_timeline_only(self):
+        """Лента подписок формируется без обращения к таблице подписок?"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
+        for query in queries:
+            self.assertNotIn('"posts_follow"', query['sql'])
+
+
+@override_settings(POSTS_MAX_FOLLOWERS_FOR_FANOUT=1)
+class HybridTimelineTestCase(BaseTestCase):
+    """Набор тестов для проверки ленты подписок с «тяжёлыми» авторами."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.heavy_author = User.objects.create_user(username='heavy-author')
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.user_other = User.objects.create_user(username='other-user')
+
+    def setUp(self):
+        """Создаёт фикстуры для отдельного теста."""
+        super().setUp()
+        Follow.objects.create(user=self.user, author=self.heavy_author)
+        Follow.objects.create(user=self.user_other, author=self.heavy_author)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.posts = [
+            Post.objects.create(author=author, text=f'Запись №{n}.')
+            for n, author in enumerate(
+                [self.author, self.heavy_author] * 3
+            )
+        ]
+
+    def test_heavy_author_posts_are_not_pushed(self):
+        """Записи «тяжёлого» автора не раскладываются по лентам?"""
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=self.heavy_author
+        ).exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_follow_index_merges_pulled_posts(self):
+        """Лента подписок содержит записи всех авторов по порядку
+        и сообщает о стоимости слияния?
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         self.posts[::-1])
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         len(self.posts))
+        self.assertIn('feed-merge', response['Server-Timing'])
+
+    def test_author_becoming_light_is_pushed(self):
+        """При уменьшении числа подписчиков записи автора раскладываются
+        по лентам?
+        """
+        Follow.objects.filter(user=self.user_other).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(),
+            len(self.posts)
+        )
+
+    def test_stale_entries_of_heavy_author_are_not_repeated(self):
+        """Записи «тяжёлого» автора, оставшиеся в ленте, не повторяются
+        в ленте подписок?
+        """
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=self.user, post=post, pub_date=post.pub_date)
+            for post in self.posts if post.author == self.heavy_author
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         self.posts[::-1])
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         len(self.posts))
+        response = self.client.get(reverse('posts:api_follow'),
+                                   {'fields': 'id'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content))['results'],
+            [{'id': post.pk} for post in self.posts[::-1]]
+        )
@@ -1,14 +1,20 @@
 """Тесты для проверки view-функций приложения posts."""
+from http import HTTPStatus
+
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from core.tests.utils import BaseSimpleURLTestCase, BaseTestCase
 from users.models import User
-from posts.models import Post, Group, Follow
+from posts.models import Post, Group, Comment, Follow
 from posts.constants import (NUMBER_OF_POSTS_ON_MAIN_PAGE,
                              NUMBER_OF_POSTS_ON_GROUP_PAGE,
                              NUMBER_OF_POSTS_ON_USER_PAGE,
+                             NUMBER_OF_COMMENTS_ON_POST_PAGE,
                              )
+from posts.utils import encode_cursor
 import posts.tests.utils as utils
 
 
@@ -85,6 +91,132 @@ class IndexPageTestCase(utils.BaseTestCaseForPageWithPaginator):
         cls.url = reverse('posts:index')
 
 
+class KeysetPaginationTestCase(BaseTestCase):
+    """Набор тестов для проверки навигации по ленте с помощью курсоров."""
+
+    PAGE_SIZE = NUMBER_OF_POSTS_ON_MAIN_PAGE
+    TOTAL_NUMBER_OF_POSTS = 2 * NUMBER_OF_POSTS_ON_MAIN_PAGE + 3
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Запись №{n}.')
+            for n in range(cls.TOTAL_NUMBER_OF_POSTS)
+        )
+        cls.url = reverse('posts:index')
+        cls.expected_ids = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def _get_page(self, **params):
+        """Возвращает страницу ленты, запрошенную с параметрами params."""
+        return self.client.get(self.url, params).context['page_obj']
+
+    def test_next_cursors_walk_through_all_posts(self):
+        """Переход по курсорам вперёд обходит все записи по порядку?"""
+        page_obj = self._get_page()
+        self.assertFalse(page_obj.has_previous())
+        ids = [post.pk for post in page_obj]
+        while page_obj.has_next():
+            page_obj = self._get_page(after=page_obj.next_cursor)
+            self.assertLessEqual(len(page_obj), self.PAGE_SIZE)
+            ids.extend(post.pk for post in page_obj)
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_previous_cursor_returns_to_previous_page(self):
+        """Переход по курсору назад возвращает на предыдущую страницу?"""
+        first_page = self._get_page()
+        second_page = self._get_page(after=first_page.next_cursor)
+        third_page = self._get_page(after=second_page.next_cursor)
+        self.assertFalse(third_page.has_next())
+        page_obj = self._get_page(before=third_page.previous_cursor)
+        self.assertEqual(list(page_obj), list(second_page))
+        page_obj = self._get_page(before=page_obj.previous_cursor)
+        self.assertEqual(list(page_obj), list(first_page))
+        self.assertFalse(page_obj.has_previous())
+
+    def test_invalid_cursor_gives_first_page(self):
+        """Некорректный курсор приводит к первой странице?"""
+        page_obj = self._get_page(after='invalid')
+        self.assertEqual([post.pk for post in page_obj],
+                         self.expected_ids[:self.PAGE_SIZE])
+
+    def test_out_of_range_cursor_gives_first_page(self):
+        """Курсор с датой вне допустимого диапазона приводит к первой
+        странице?
+        """
+        for cursor in ('999999999999999999999.1', '-999999999999999999999.1',
+                       '999999999999999999.1'):
+            with self.subTest(cursor=cursor):
+                page_obj = self._get_page(after=cursor)
+                self.assertEqual([post.pk for post in page_obj],
+                                 self.expected_ids[:self.PAGE_SIZE])
+
+    def test_keyset_page_does_not_count_posts(self):
+        """Страница по курсору формируется без подсчёта записей
+        и без OFFSET?
+        """
+        first_page = self._get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'after': first_page.next_cursor})
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+
+
+class PostCardsProjectionTestCase(BaseTestCase):
+    """Набор тестов для проверки того, что ленты загружают только поля,
+    нужные для карточек записей.
+    """
+
+    UNUSED_COLUMNS = (
+        '"auth_user"."password"',
+        '"auth_user"."email"',
+        '"posts_group"."description"',
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.user = User.objects.create_user(username='test-user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Группа записей для тестирования',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(author=cls.author, group=cls.group, text='Запись.')
+
+    def test_feeds_do_not_load_unused_columns(self):
+        """Запросы лент не загружают неиспользуемые столбцы?"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        self.client.force_login(self.user)
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            feed_queries = [
+                query['sql'] for query in queries
+                if query['sql'].startswith('SELECT "posts_post"."id"')
+            ]
+            with self.subTest(url=url):
+                self.assertEqual(len(feed_queries), 1)
+                for column in self.UNUSED_COLUMNS:
+                    self.assertNotIn(column, feed_queries[0])
+
+
 class GroupListPageTestCase(utils.BaseTestCaseForPageWithPaginator):
     """Набор тестов для страницы posts:group_list."""
 
@@ -201,6 +333,90 @@ class PostDetailPageTestCase(utils.BaseTestCaseWithUploadedFiles):
         self._test_files_are_equal(post1.image, post2.image)
 
 
+class CommentsPaginationTestCase(BaseTestCase):
+    """Набор тестов для проверки постраничной загрузки комментариев
+    на странице записи.
+    """
+
+    PAGE_SIZE = NUMBER_OF_COMMENTS_ON_POST_PAGE
+    TOTAL_NUMBER_OF_COMMENTS = 2 * NUMBER_OF_COMMENTS_ON_POST_PAGE + 3
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаёт фикстуры для всего набора тестов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test-author')
+        cls.post = Post.objects.create(author=cls.author, text='Запись.')
+        Comment.objects.bulk_create(
+            Comment(author=cls.author, post=cls.post, text=f'Комментарий {n}')
+            for n in range(cls.TOTAL_NUMBER_OF_COMMENTS)
+        )
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.comments_url = reverse('posts:post_comments', args=[cls.post.pk])
+        cls.expected_ids = list(
+            cls.post.comments.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def test_page_shows_newest_comments_only(self):
+        """Страница записи содержит только последние комментарии?"""
+        comments = self.client.get(self.url).context['comments']
+        self.assertEqual([comment.pk for comment in comments],
+                         self.expected_ids[:self.PAGE_SIZE])
+        self.assertTrue(comments.has_next())
+
+    def test_older_comments_are_loaded_by_cursor(self):
+        """Фрагменты с более ранними комментариями по курсорам содержат
+        все комментарии ровно по одному разу?
+        """
+        comments = self.client.get(self.url).context['comments']
+        ids = [comment.pk for comment in comments]
+        while comments.has_next():
+            response = self.client.get(self.comments_url,
+                                       {'after': comments.next_cursor})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            ids.extend(comment.pk for comment in comments)
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_fragment_links_to_older_comments(self):
+        """Фрагмент содержит ссылку на следующие комментарии, пока они
+        есть?
+        """
+        comments = self.client.get(self.url).context['comments']
+        response = self.client.get(self.comments_url,
+                                   {'after': comments.next_cursor})
+        self.assertContains(
+            response, f'?after={response.context["comments"].next_cursor}'
+        )
+        last_id = self.expected_ids[-self.PAGE_SIZE]
+        response = self.client.get(self.comments_url, {
+            'after': encode_cursor(Comment.objects.get(pk=last_id))
+        })
+        self.assertNotContains(response, 'data-more-comments')
+
+    def test_fragment_without_cursor_is_rejected(self):
+        """Фрагмент без корректного курсора не повторяет последние
+        комментарии, а отклоняется?
+        """
+        for params in ({}, {'after': ''}, {'after': 'курсор'},
+                       {'page': 2}):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get(self.comments_url, params).status_code,
+                    HTTPStatus.BAD_REQUEST
+                )
+
+    def test_fragment_of_nonexistent_post_is_not_found(self):
+        """Фрагмент комментариев несуществующей записи недоступен?"""
+        url = reverse('posts:post_comments', args=[self.post.pk + 1])
+        cursor = encode_cursor(Comment.objects.first())
+        self.assertEqual(self.client.get(url, {'after': cursor}).status_code,
+                         HTTPStatus.NOT_FOUND)
+
+
 class PostCreatePageTestCase(utils.BaseTestCaseForPostFormView):
     """Набор тестов для страницы posts:post_create."""
 
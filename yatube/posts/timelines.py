@@ -0,0 +1,239 @@
+"""Ленты подписок посетителей сайта.
+
+Используется гибридная схема. Записи обычных авторов раскладываются
+по лентам подписчиков в момент публикации (push, см. posts.signals),
+поэтому читаются одним диапазонным просмотром индекса (user, -pub_date)
+таблицы TimelineEntry. Записи «тяжёлых» авторов, число подписчиков
+которых превышает порог POSTS_MAX_FOLLOWERS_FOR_FANOUT, в ленты
+не раскладываются, а выбираются при чтении (pull) и сливаются с лентой.
+
+Множество «тяжёлых» авторов кэшируется на HEAVY_AUTHORS_CACHE_TIMEOUT
+секунд и пересчитывается при изменении подписок. Записи авторов, ставших
+«тяжёлыми» без изменения подписок (например, при уменьшении порога),
+могут оставаться в лентах, поэтому при чтении они исключаются из ленты
+и берутся только из выборки при чтении.
+"""
+import heapq
+import logging
+import time
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import counters
+from .constants import (MAX_FOLLOWERS_FOR_FANOUT, BULK_CREATE_BATCH_SIZE,
+                        HEAVY_AUTHORS_CACHE_TIMEOUT)
+from .models import Post, Follow, TimelineEntry
+from .utils import get_bulk_batch_size
+
+logger = logging.getLogger(__name__)
+
+HEAVY_AUTHORS_KEY = 'posts_heavy_authors'
+
+
+def get_max_followers_for_fanout():
+    """Возвращает порог числа подписчиков, выше которого записи автора
+    не раскладываются по лентам.
+    """
+    return getattr(settings, 'POSTS_MAX_FOLLOWERS_FOR_FANOUT',
+                   MAX_FOLLOWERS_FOR_FANOUT)
+
+
+def get_follower_ids(author_id):
+    """Возвращает список id подписчиков автора author_id."""
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+
+
+def compute_heavy_author_ids():
+    """Вычисляет множество id «тяжёлых» авторов."""
+    return frozenset(Follow.objects.values('author_id').annotate(
+        followers=Count('pk')
+    ).filter(
+        followers__gt=get_max_followers_for_fanout()
+    ).values_list('author_id', flat=True))
+
+
+def get_heavy_author_ids():
+    """Возвращает множество id «тяжёлых» авторов."""
+    return cache.get_or_set(HEAVY_AUTHORS_KEY, compute_heavy_author_ids,
+                            HEAVY_AUTHORS_CACHE_TIMEOUT)
+
+
+def update_author_weight(author_id):
+    """Пересматривает, является ли автор author_id «тяжёлым», после
+    изменения числа его подписчиков.
+
+    При переходе автора в «тяжёлые» его записи удаляются из лент
+    подписчиков, при обратном переходе — раскладываются по ним.
+    """
+    heavy_author_ids = get_heavy_author_ids()
+    was_heavy = author_id in heavy_author_ids
+    is_heavy = (Follow.objects.filter(author_id=author_id).count()
+                > get_max_followers_for_fanout())
+    if was_heavy == is_heavy:
+        return
+
+    follower_ids = get_follower_ids(author_id)
+    if is_heavy:
+        cache.set(HEAVY_AUTHORS_KEY, heavy_author_ids | {author_id},
+                  HEAVY_AUTHORS_CACHE_TIMEOUT)
+        TimelineEntry.objects.filter(post__author_id=author_id).delete()
+    else:
+        cache.set(HEAVY_AUTHORS_KEY, heavy_author_ids - {author_id},
+                  HEAVY_AUTHORS_CACHE_TIMEOUT)
+        for user_id in follower_ids:
+            fill_timeline(user_id, author_id)
+    counters.reset_posts_count(
+        [counters.follower_scope(user_id) for user_id in follower_ids]
+    )
+
+
+def push_post(post):
+    """Добавляет запись post в ленты подписчиков её автора и возвращает
+    список id этих подписчиков. Записи «тяжёлых» авторов в ленты
+    не добавляются.
+    """
+    if post.author_id in get_heavy_author_ids():
+        return []
+    follower_ids = get_follower_ids(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        ignore_conflicts=True,
+    )
+    return follower_ids
+
+
+def push_posts(posts, batch_size=BULK_CREATE_BATCH_SIZE):
+    """Добавляет записи posts в ленты подписчиков их авторов, как push_post,
+    и возвращает множество id этих подписчиков.
+
+    Используется для записей, созданных без отправки сигналов. Записи,
+    уже добавленные в ленты, пропускаются.
+    """
+    heavy_author_ids = get_heavy_author_ids()
+    rows = posts.exclude(
+        author_id__in=heavy_author_ids
+    ).order_by().values_list('pk', 'author_id', 'pub_date')
+    follower_ids = {}
+
+    def get_followers(author_id):
+        if author_id not in follower_ids:
+            follower_ids[author_id] = get_follower_ids(author_id)
+        return follower_ids[author_id]
+
+    entries = (
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, author_id, pub_date in rows.iterator()
+        for user_id in get_followers(author_id)
+    )
+    batch_size = get_bulk_batch_size(TimelineEntry, batch_size)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return {user_id for ids in follower_ids.values() for user_id in ids}
+
+
+def get_pushed_follower_ids(post):
+    """Возвращает список id подписчиков, в ленты которых была добавлена
+    запись post.
+    """
+    if post.author_id in get_heavy_author_ids():
+        return []
+    return get_follower_ids(post.author_id)
+
+
+def fill_timeline(user_id, author_id):
+    """Добавляет в ленту пользователя user_id все записи автора author_id,
+    если автор не является «тяжёлым».
+    """
+    if author_id in get_heavy_author_ids():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        ignore_conflicts=True,
+    )
+
+
+def clear_timeline(user_id, author_id):
+    """Удаляет из ленты пользователя user_id все записи автора author_id."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+class FollowFeed:
+    """Представляет ленту подписок пользователя user.
+
+    Записи «тяжёлых» авторов, на которых подписан пользователь, берутся
+    только из выборки при чтении, даже если они остались в его ленте.
+    Поддерживает интерфейс, необходимый паджинатору: count() и срезы.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        heavy_author_ids = get_heavy_author_ids()
+        self.pulled_author_ids = list(Follow.objects.filter(
+            user=user, author_id__in=heavy_author_ids
+        ).values_list('author_id', flat=True)) if heavy_author_ids else []
+        self.pushed = Post.objects.filter(
+            timeline_entries__user=user
+        ).exclude(
+            author_id__in=self.pulled_author_ids
+        ).order_by(
+            '-timeline_entries__pub_date'
+        ).for_cards()
+        self.pulled = Post.objects.filter(
+            author_id__in=self.pulled_author_ids
+        ).for_cards()
+        self.merge_stats = None
+
+    def count(self):
+        """Возвращает количество записей в ленте."""
+        total = counters.get_posts_count(
+            counters.follower_scope(self.user.pk), self.pushed
+        )
+        for author_id in self.pulled_author_ids:
+            total += counters.get_posts_count(
+                counters.author_scope(author_id),
+                Post.objects.filter(author_id=author_id)
+            )
+        return total
+
+    def __getitem__(self, key):
+        if not self.pulled_author_ids:
+            return self.pushed[key]
+        start = time.perf_counter()
+        pushed = list(self.pushed[:key.stop])
+        pulled = list(self.pulled[:key.stop])
+        posts = list(islice(
+            heapq.merge(pushed, pulled, key=attrgetter('pub_date'),
+                        reverse=True),
+            key.start, key.stop
+        ))
+        self.merge_stats = {
+            'threshold': get_max_followers_for_fanout(),
+            'pulled_authors': len(self.pulled_author_ids),
+            'rows': len(pushed) + len(pulled),
+            'duration': time.perf_counter() - start,
+        }
+        logger.debug('Follow feed merge for user %s: %s',
+                     self.user.pk, self.merge_stats)
+        return posts
+
+    def __iter__(self):
+        if not self.pulled_author_ids:
+            return iter(self.pushed)
+        return heapq.merge(self.pushed.iterator(), self.pulled.iterator(),
+                           key=attrgetter('pub_date'), reverse=True)
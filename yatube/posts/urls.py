@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'posts'
 
@@ -8,14 +8,33 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('export/', views.export_data, name='export_data'),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('feeds/rss/', feeds.latest_posts_rss, name='feed_rss'),
+    path('feeds/atom/', feeds.latest_posts_atom, name='feed_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_posts_rss,
+         name='group_feed_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_posts_atom,
+         name='group_feed_atom'),
+    path('profile/<str:username>/rss/', feeds.author_posts_rss,
+         name='profile_feed_rss'),
+    path('profile/<str:username>/atom/', feeds.author_posts_atom,
+         name='profile_feed_atom'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/v1/profile/<str:username>/', api.profile,
+         name='api_profile'),
+    path('api/v1/follow/', api.follow_index, name='api_follow'),
 ]
@@ -1,8 +1,194 @@
-from django.core.paginator import Paginator
+from datetime import datetime, timedelta
 
+from django.core.paginator import Paginator, Page
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-def make_page_obj(request, content, page_size):
-    """Формирует запрошенную страницу контента."""
-    paginator = Paginator(content, page_size)
+from .counters import get_posts_count
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def make_cursor(pub_date, pk):
+    """Возвращает курсор, указывающий на позицию объекта с ключом
+    (pub_date, pk) в ленте.
+    """
+    micros = (pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{pk}'
+
+
+def encode_cursor(obj):
+    """Возвращает курсор, указывающий на позицию объекта obj в ленте."""
+    return make_cursor(obj.pub_date, obj.pk)
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (pub_date, pk), закодированную в курсоре cursor,
+    или None, если курсор некорректен.
+    """
+    try:
+        micros, pk = (int(part) for part in cursor.split('.'))
+        return EPOCH + timedelta(microseconds=micros), pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class ScopedCountPaginator(Paginator):
+    """Паджинатор, получающий общее количество объектов из счётчика
+    области scope вместо запроса COUNT.
+    """
+
+    def __init__(self, object_list, per_page, scope=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scope = scope
+
+    @cached_property
+    def count(self):
+        if self.scope is None:
+            return super().count
+        return get_posts_count(self.scope, self.object_list)
+
+
+class KeysetPage(Page):
+    """Представляет страницу контента, сформированную по курсору."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, *, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)} items>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        """Курсор для перехода к более старым записям."""
+        if self._has_next:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Курсор для перехода к более новым записям."""
+        if self._has_previous:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class KeysetPaginator(ScopedCountPaginator):
+    """Паджинатор, формирующий страницы по ключу (pub_date, id).
+
+    Не выполняет подсчёт общего количества объектов и не использует OFFSET,
+    поэтому время получения страницы не зависит от её удалённости от начала
+    ленты.
+    """
+
+    def get_keyset_page(self, after=None, before=None):
+        """Возвращает страницу объектов, следующих за курсором after
+        или предшествующих курсору before. Некорректный курсор
+        игнорируется.
+        """
+        content = self.object_list.order_by('-pub_date', '-pk')
+        key = decode_cursor(after)
+        if key is not None:
+            pub_date, pk = key
+            objects = list(content.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )[:self.per_page + 1])
+            return KeysetPage(
+                objects[:self.per_page], self,
+                has_next=len(objects) > self.per_page, has_previous=True
+            )
+
+        key = decode_cursor(before)
+        if key is not None:
+            pub_date, pk = key
+            objects = list(content.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).reverse()[:self.per_page + 1])
+            if len(objects) <= self.per_page:
+                return self.get_keyset_page()
+            objects.reverse()
+            return KeysetPage(
+                objects[1:], self, has_next=True, has_previous=True
+            )
+
+        objects = list(content[:self.per_page + 1])
+        return KeysetPage(
+            objects[:self.per_page], self,
+            has_next=len(objects) > self.per_page, has_previous=False
+        )
+
+
+def make_page_obj(request, content, page_size, keyset=False, scope=None):
+    """Формирует запрошенную страницу контента.
+
+    При keyset=True страница, запрошенная без явного номера, формируется
+    по курсору из параметров after/before запроса. Если задана область
+    scope, общее количество записей берётся из её счётчика.
+    """
+    if keyset and 'page' not in request.GET:
+        paginator = KeysetPaginator(content, page_size, scope)
+        return paginator.get_keyset_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+
+    paginator = ScopedCountPaginator(content, page_size, scope)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def make_server_timing(name, stats):
+    """Формирует значение заголовка Server-Timing для метрики name
+    по словарю stats, содержащему длительность duration в секундах.
+    """
+    description = ' '.join(
+        f'{key}={value}' for key, value in stats.items()
+        if key != 'duration'
+    )
+    return f'{name};dur={stats["duration"] * 1000:.3f};desc="{description}"'
+
+
+def query_budget(max_queries):
+    """Задаёт для view-функции бюджет — наибольшее количество запросов
+    к базе данных при формировании страницы с холодным кэшем.
+
+    Соблюдение бюджетов проверяется тестами (см. test_query_budgets).
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_bulk_batch_size(model, batch_size):
+    """Возвращает размер пакета для bulk_create объектов модели model,
+    не превышающий batch_size и ограничений базы данных на количество
+    параметров и строк в одном запросе.
+    """
+    return min(batch_size, connection.ops.bulk_batch_size(
+        model._meta.concrete_fields, []
+    ))
+
+
+def split_ids(ids, batch_size):
+    """Возвращает итератор по спискам из не более чем batch_size id
+    из ids, каждый из которых можно передать в условие pk__in,
+    не превышая ограничений базы данных на количество параметров запроса.
+    """
+    ids = list(ids)
+    batch_size = min(batch_size,
+                     connection.ops.bulk_batch_size(['pk'], ids) or 1)
+    for start in range(0, len(ids), batch_size):
+        yield ids[start:start + batch_size]
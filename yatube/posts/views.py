@@ -1,23 +1,45 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
 from users.models import User
+from . import counters
 from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
-from .utils import make_page_obj
+from .caching import (versioned_cache_page, group_page_scope,
+                      profile_page_scope, post_etag)
+from .export import stream_user_archive
+from .search import search_posts
+from .utils import (KeysetPaginator, decode_cursor, make_page_obj,
+                    make_server_timing, query_budget)
+from .timelines import FollowFeed
 from .constants import (NUMBER_OF_POSTS_ON_MAIN_PAGE,
                         NUMBER_OF_POSTS_ON_GROUP_PAGE,
                         NUMBER_OF_POSTS_ON_USER_PAGE,
+                        NUMBER_OF_COMMENTS_ON_POST_PAGE,
+                        NUMBER_OF_POSTS_ON_SEARCH_PAGE,
+                        INDEX_PAGE_CACHE_SOFT_TIMEOUT,
+                        INDEX_PAGE_CACHE_HARD_TIMEOUT,
+                        GROUP_PAGE_CACHE_SOFT_TIMEOUT,
+                        GROUP_PAGE_CACHE_HARD_TIMEOUT,
+                        PROFILE_PAGE_CACHE_SOFT_TIMEOUT,
+                        PROFILE_PAGE_CACHE_HARD_TIMEOUT,
                         )
 
 
-@cache_page(20, key_prefix='index_page')
+@versioned_cache_page('index_page',
+                      lambda request: [counters.ALL_POSTS_SCOPE],
+                      INDEX_PAGE_CACHE_SOFT_TIMEOUT,
+                      INDEX_PAGE_CACHE_HARD_TIMEOUT)
+@query_budget(4)
 def index(request):
     """Отображает главную страницу."""
-    posts = Post.objects.select_related('group')
-    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_MAIN_PAGE)
+    posts = Post.objects.for_cards()
+    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_MAIN_PAGE,
+                             keyset=True, scope=counters.ALL_POSTS_SCOPE)
     context = {
         'page_obj': page_obj,
     }
@@ -25,11 +47,18 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@versioned_cache_page('group_page',
+                      lambda request, slug: [group_page_scope(slug)],
+                      GROUP_PAGE_CACHE_SOFT_TIMEOUT,
+                      GROUP_PAGE_CACHE_HARD_TIMEOUT)
+@query_budget(5)
 def group_posts(request, slug):
     """Отображает страницу группы slug."""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_GROUP_PAGE)
+    posts = group.posts.for_cards()
+    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_GROUP_PAGE,
+                             keyset=True,
+                             scope=counters.group_scope(group.pk))
     context = {
         'page_obj': page_obj,
         'group': group,
@@ -38,11 +67,19 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@versioned_cache_page('profile_page',
+                      lambda request, username: [profile_page_scope(username)],
+                      PROFILE_PAGE_CACHE_SOFT_TIMEOUT,
+                      PROFILE_PAGE_CACHE_HARD_TIMEOUT)
+@query_budget(6)
 def profile(request, username):
     """Отображает страницу пользователя username."""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_USER_PAGE)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    posts = author.posts.for_cards()
+    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_USER_PAGE,
+                             keyset=True,
+                             scope=counters.author_scope(author.pk))
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(user=request.user, author=author).exists()
@@ -57,11 +94,22 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=post_etag)
+@query_budget(5)
 def post_detail(request, post_id):
-    """Отображает страницу записи post_id."""
-    post = get_object_or_404(Post, id=post_id)
+    """Отображает страницу записи post_id.
+
+    Запись загружается одним запросом вместе с автором, его статистикой
+    и группой, а последние комментарии — одним запросом вместе с их
+    авторами. Более старые комментарии подгружаются с post_comments.
+    """
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form = CommentForm()
-    comments = post.comments.all()
+    comments = KeysetPaginator(
+        post.comments.for_list(), NUMBER_OF_COMMENTS_ON_POST_PAGE
+    ).get_keyset_page()
     context = {
         'post': post,
         'form': form,
@@ -71,7 +119,31 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(2)
+def post_comments(request, post_id):
+    """Отображает фрагмент страницы записи post_id со страницей
+    комментариев, следующих за курсором из параметра after запроса.
+
+    Последние комментарии уже показаны на странице записи, поэтому
+    запрос без корректного курсора отклоняется.
+    """
+    after = request.GET.get('after')
+    if decode_cursor(after) is None:
+        return HttpResponseBadRequest()
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = KeysetPaginator(
+        post.comments.for_list(), NUMBER_OF_COMMENTS_ON_POST_PAGE
+    ).get_keyset_page(after=after)
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     """Отображает страницу создания новой записи."""
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -100,7 +172,7 @@ def post_edit(request, post_id):
                     instance=post
                     )
     if request.method == 'POST' and form.is_valid():
-        post.save()
+        post.save(update_fields=PostForm.Meta.fields)
         return redirect(
             reverse('posts:post_detail', args=[post_id])
         )
@@ -110,6 +182,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Обрабатывает запрос на создание комментария к записи."""
     post = get_object_or_404(Post, id=post_id)
@@ -123,24 +196,57 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(3)
+def search(request):
+    """Отображает страницу результатов поиска записей по тексту
+    из параметра q запроса.
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = search_posts(Post.objects.for_cards(), query,
+                            NUMBER_OF_POSTS_ON_SEARCH_PAGE,
+                            after=request.GET.get('after'))
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@query_budget(6)
 def follow_index(request):
     """Отображает страницу с постами авторов, на которых подписан текущий
     пользователь.
     """
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related(
-        'group'
-    )
-    page_obj = make_page_obj(request, posts, NUMBER_OF_POSTS_ON_MAIN_PAGE)
+    feed = FollowFeed(request.user)
+    page_obj = make_page_obj(request, feed, NUMBER_OF_POSTS_ON_MAIN_PAGE)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/follow.html', context)
+    response = render(request, 'posts/follow.html', context)
+    if feed.merge_stats:
+        response['Server-Timing'] = make_server_timing(
+            'feed-merge', feed.merge_stats
+        )
+    return response
+
+
+@login_required
+def export_data(request):
+    """Отдаёт ZIP-архив с записями, комментариями и изображениями
+    текущего пользователя.
+    """
+    response = StreamingHttpResponse(stream_user_archive(request.user),
+                                     content_type='application/zip')
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{request.user.username}.zip"'
+    )
+    return response
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Обрабатывает запрос на создание подписки на автора username."""
     author = get_object_or_404(User, username=username)
@@ -151,6 +257,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Обрабатывает запрос на удаление подписки на автора username."""
     author = get_object_or_404(User, username=username)
@@ -145,8 +145,20 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Общий для всех процессов кэш в файле SQLite включается указанием пути
+# к файлу в переменной окружения CACHE_DB.
+cache_db = os.getenv('CACHE_DB')
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': cache_db,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+            'COMPRESS_MIN_SIZE': 1024,
+            'COMPRESS_LEVEL': 1,
+        },
+    } if cache_db else {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }